@@ -1,15 +1,28 @@
 #funções de análise: curva de aprendizagem e política aprendida
 #aqui é só pra mostrar gráfico e tabela
 
-from typing import Dict, Tuple
+from importlib.util import find_spec
+from typing import Dict, List, Mapping, Tuple
 import numpy as np
 
-#matplotlib é opcional (somente para o gráfico)
-try:
-    import matplotlib.pyplot as plt
-    HAS_MPL = True
-except Exception:
-    HAS_MPL = False
+#matplotlib é opcional (somente para o gráfico) e pesado (~0.5 s pra importar):
+#aqui só checa se existe; o import de verdade fica no _pyplot(), no primeiro gráfico
+HAS_MPL = find_spec("matplotlib") is not None
+
+def _pyplot():
+    #pyplot, ou None (com aviso) se o matplotlib não existe ou quebra no import:
+    #aí o gráfico é pulado e a execução continua, como antes
+    global HAS_MPL
+    if not HAS_MPL:
+        print("[Aviso] matplotlib não encontrado (ou quebrado); gráfico não será salvo.")
+        return None
+    try:
+        import matplotlib.pyplot as plt
+    except Exception as e:
+        HAS_MPL = False
+        print(f"[Aviso] matplotlib não pôde ser importado ({e}); gráfico não será salvo.")
+        return None
+    return plt
 
 State = Tuple[int, int, int]
 
@@ -20,16 +33,26 @@ def moving_average(x: np.ndarray, window: int = 5000) -> np.ndarray:
     c = np.cumsum(np.insert(x, 0, 0))
     return (c[window:] - c[:-window]) / float(window)
 
-def save_learning_curve(rewards: np.ndarray, path: str = "learning_curve.png"):
+def curve_data(stats: dict) -> Tuple[np.ndarray, int]:
+    #pega a curva do stats do treino: (retornos por episódio, 1) ou (médias por bloco, bloco)
+    if "learning_curve" in stats:
+        return stats["learning_curve"], stats["curve_block"]
+    return stats["episode_rewards"], 1
+
+def save_learning_curve(rewards: np.ndarray, path: str = "learning_curve.png", block: int = 1):
     #salva o gráfico, se der
-    if not HAS_MPL:
-        print("[Aviso] matplotlib não encontrado; gráfico não será salvo.")
+    #block > 1: rewards já são médias por bloco de episódios (treino com curve_points)
+    plt = _pyplot()
+    if plt is None:
         return
-    w = max(10, min(5000, len(rewards)//20))
+    w = _curve_window(len(rewards), block)
     ma = moving_average(rewards, window=w)
     plt.figure()
     plt.plot(ma)
-    plt.title(f"Recompensa média móvel (janela={w})")
+    if block > 1:
+        plt.title(f"Recompensa média móvel (janela={w} blocos de {block} episódios)")
+    else:
+        plt.title(f"Recompensa média móvel (janela={w})")
     plt.xlabel("blocos")
     plt.ylabel("retorno médio")
     plt.tight_layout()
@@ -37,13 +60,63 @@ def save_learning_curve(rewards: np.ndarray, path: str = "learning_curve.png"):
     plt.close()
     print(f"[OK] Gráfico salvo em: {path}")
 
-def learned_policy_table(Q: Dict[State, np.ndarray], usable_ace: bool) -> np.ndarray:
+def _curve_window(n: int, block: int) -> int:
+    #janela da média móvel usada nos gráficos
+    if block > 1:
+        return max(1, min(50, n//20))
+    return max(10, min(5000, n//20))
+
+def save_curve_data(rewards: np.ndarray, path: str, block: int = 1, label: str = "", max_points: int = 2000):
+    #guarda a curva já processada (média móvel reduzida a no máx. max_points pontos) num .npz;
+    #o gráfico sai depois, com o render_curves.py, sem precisar treinar de novo
+    rewards = np.asarray(rewards, dtype=np.float64)
+    w = _curve_window(len(rewards), block)
+    ma = moving_average(rewards, window=w)
+    #eixo x em episódios: o ponto i da média móvel cobre até o bloco i+w
+    x = (np.arange(len(ma)) + (w if len(rewards) >= w else 1)) * block
+    if len(ma) > max_points:
+        idx = np.linspace(0, len(ma) - 1, max_points).round().astype(int)
+        x, ma = x[idx], ma[idx]
+    np.savez_compressed(path, x=x.astype(np.int64), y=ma.astype(np.float32),
+                        window=w, block=block, label=label)
+
+def load_curve_data(path: str) -> Dict[str, object]:
+    #lê um .npz do save_curve_data
+    with np.load(path) as d:
+        return {"x": d["x"], "y": d["y"], "window": int(d["window"]), "block": int(d["block"]),
+                "label": str(d["label"])}
+
+def plot_curves(curves: List[Dict[str, object]], path: str, title: str = "") -> bool:
+    #desenha uma ou várias curvas (dicts do load_curve_data) na mesma figura;
+    #devolve se o PNG foi salvo (False quando o matplotlib não existe ou não importa)
+    plt = _pyplot()
+    if plt is None:
+        return False
+    plt.figure()
+    for c in curves:
+        plt.plot(c["x"], c["y"], label=c["label"] or None, linewidth=1.0 if len(curves) > 1 else 1.5)
+    if not title and len(curves) == 1:
+        c = curves[0]
+        title = f"Recompensa média móvel (janela={c['window']}" + (
+            f" blocos de {c['block']} episódios)" if c["block"] > 1 else ")")
+    plt.title(title)
+    plt.xlabel("episódios")
+    plt.ylabel("retorno médio")
+    if len(curves) > 1 and any(c["label"] for c in curves):
+        plt.legend(fontsize="x-small")
+    plt.tight_layout()
+    plt.savefig(path, dpi=120)
+    plt.close()
+    return True
+
+def learned_policy_table(Q: Mapping[State, np.ndarray], usable_ace: bool) -> np.ndarray:
     #monta a tabela da política aprendida, tipo aquelas do livro
     table = np.zeros((10, 10), dtype=int)  # linhas: player 12..21; colunas: dealer 1..10
     for p_sum in range(12, 22):
         for d_up in range(1, 11):
             s = (p_sum, d_up, int(usable_ace))
-            a = int(np.argmax(Q[s]))
+            q = Q.get(s)  #get não insere estado novo (defaultdict inseria)
+            a = 0 if q is None else int(np.argmax(q))
             table[p_sum - 12, d_up - 1] = a  #0=parar (S), 1=pedir (H)
     return table
 
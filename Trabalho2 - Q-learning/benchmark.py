@@ -0,0 +1,214 @@
+#benchmark de throughput do Q-learning (passos/s e episódios/s)
+#roda tamanhos e seeds fixos, salva um JSON com a máquina e compara com um baseline.
+
+#como usar:
+#   python benchmark.py                                  # mede e salva bench_<maquina>.json
+#   python benchmark.py --save-baseline baseline.json    # mede e guarda como baseline
+#   python benchmark.py --baseline baseline.json         # falha (exit 1) se cair mais que --threshold
+#   python benchmark.py --imports-only                   # só o tempo de import dos pontos de entrada
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from env_blackjack import BlackjackEnv, FastBlackjackEnv
+from qlearning import QTable, epsilon_greedy, train_q_learning, evaluate_policy
+
+def machine_info() -> Dict[str, object]:
+    #identifica a máquina pra não comparar laranja com banana
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+def _best_of(fn: Callable[[], Tuple[int, float]], repeat: int) -> Dict[str, float]:
+    #roda fn() `repeat` vezes e fica com a mais rápida;
+    #fn devolve (nº de operações, segundos) medindo só a parte que interessa
+    best = None
+    for _ in range(repeat):
+        n, dt = fn()
+        if best is None or n / dt > best["per_s"]:
+            best = {"n": n, "seconds": round(dt, 6), "per_s": n / dt}
+    return best
+
+def _bench_env_step(env_cls, n_steps: int):
+    def run():
+        env = env_cls(seed=0)
+        actions = np.random.default_rng(0).integers(0, 2, size=n_steps).tolist()
+        t0 = time.perf_counter()
+        env.reset()
+        for a in actions:
+            _, _, done = env.step(a)
+            if done:
+                env.reset()
+        return n_steps, time.perf_counter() - t0
+    return run
+
+def _bench_epsilon_greedy(n_calls: int):
+    def run():
+        Q = QTable()
+        rng = random.Random(0)
+        s = (15, 10, 0)
+        t0 = time.perf_counter()
+        for _ in range(n_calls):
+            epsilon_greedy(Q, s, 0.1, rng)
+        return n_calls, time.perf_counter() - t0
+    return run
+
+def _bench_train(n_episodes: int, n_envs: int):
+    def run():
+        t0 = time.perf_counter()
+        train_q_learning(num_episodes=n_episodes, seed=42, n_envs=n_envs)
+        return n_episodes, time.perf_counter() - t0
+    return run
+
+def _bench_evaluate(n_episodes: int, n_envs: int):
+    #a Q treinada é só preparo; o tempo medido é o do evaluate_policy
+    Q, _ = train_q_learning(num_episodes=20_000, seed=42)
+    def run():
+        t0 = time.perf_counter()
+        evaluate_policy(Q, n_episodes=n_episodes, seed=7, n_envs=n_envs)
+        return n_episodes, time.perf_counter() - t0
+    return run
+
+#pontos de entrada cujo tempo de import (startup da CLI e de cada worker) é medido
+IMPORT_MODULES = ("main", "experiments", "render_curves", "qlearning", "analysis_utils")
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    #linhas do -X importtime: (nível, self_us, cumulativo_us, módulo)
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line.split("|")
+        name = name[1:]
+        level = (len(name) - len(name.lstrip())) // 2
+        rows.append((level, int(self_us.split(":")[1]), int(cum_us), name.strip()))
+    return rows
+
+def import_time_report(module: str, repeat: int = 3, top: int = 5) -> Dict[str, object]:
+    #importa `module` num processo novo com -X importtime (melhor de `repeat`) e resume:
+    #tempo total do import e os `top` imports diretos mais caros
+    here = os.path.dirname(os.path.abspath(__file__))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=here, capture_output=True, text=True, check=True)
+        rows = _parse_importtime(proc.stderr)
+        #o módulo é a última linha de nível 0; os filhos diretos vêm logo antes, com nível 1
+        end = max(i for i, r in enumerate(rows) if r[0] == 0 and r[3] == module)
+        start = max([i for i in range(end) if rows[i][0] == 0] or [-1]) + 1
+        children = sorted((r for r in rows[start:end] if r[0] == 1), key=lambda r: -r[2])
+        total_ms = rows[end][2] / 1000
+        if best is None or total_ms < best["total_ms"]:
+            best = {"total_ms": round(total_ms, 2),
+                    "top": [[r[3], round(r[2] / 1000, 2)] for r in children[:top]]}
+    return best
+
+def run_import_benchmarks(repeat: int = 3) -> Dict[str, Dict[str, object]]:
+    report = {}
+    for module in IMPORT_MODULES:
+        report[module] = import_time_report(module, repeat)
+        top = ", ".join(f"{name} {ms:.0f}ms" for name, ms in report[module]["top"])
+        print(f"import {module:<20} {report[module]['total_ms']:>8.1f} ms   ({top})")
+    return report
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 3) -> Dict[str, Dict[str, float]]:
+    n = lambda x: max(1, int(x * scale))
+    cases = {
+        "env_step.BlackjackEnv": ("steps", lambda: _bench_env_step(BlackjackEnv, n(200_000))),
+        "env_step.FastBlackjackEnv": ("steps", lambda: _bench_env_step(FastBlackjackEnv, n(200_000))),
+        "epsilon_greedy": ("calls", lambda: _bench_epsilon_greedy(n(200_000))),
+        "train_q_learning": ("episodes", lambda: _bench_train(n(100_000), 1)),
+        "train_q_learning.vec": ("episodes", lambda: _bench_train(n(500_000), 1024)),
+        "evaluate_policy": ("episodes", lambda: _bench_evaluate(n(100_000), 1)),
+        "evaluate_policy.vec": ("episodes", lambda: _bench_evaluate(n(1_000_000), 4096)),
+    }
+    results = {}
+    for name, (unit, make) in cases.items():
+        results[name] = {"unit": unit, **_best_of(make(), repeat)}
+        print(f"{name:<28} {results[name]['per_s']:>14,.0f} {unit}/s")
+    return results
+
+def compare(current: dict, baseline: dict, threshold: float, import_threshold: float = 0.5) -> list:
+    #devolve a lista de regressões (nome, baseline/s, atual/s, razão). Os tempos de import são
+    #de milissegundos e variam ~20% entre execuções iguais, então têm limite próprio (bem mais folgado)
+    if current["machine"].get("hostname") != baseline["machine"].get("hostname"):
+        print(f"[Aviso] baseline é de outra máquina ({baseline['machine'].get('hostname')}); comparação aproximada.")
+    if current.get("scale") != baseline.get("scale"):
+        print("[Aviso] baseline foi medido com outro --scale.")
+    regressions = []
+    print(f"\n{'benchmark':<28} {'baseline/s':>14} {'atual/s':>14} {'razão':>7}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = cur["per_s"] / base["per_s"]
+        limit = import_threshold if name.startswith("import.") else threshold
+        flag = "  <-- REGRESSÃO" if ratio < 1.0 - limit else ""
+        print(f"{name:<28} {base['per_s']:>14,.0f} {cur['per_s']:>14,.0f} {ratio:>7.2f}{flag}")
+        if flag:
+            regressions.append((name, base["per_s"], cur["per_s"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de throughput do Blackjack Q-learning.")
+    parser.add_argument("--out", type=str, default="", help="JSON de saída (padrão: bench_<hostname>.json)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica os tamanhos fixos (ex.: 0.1 pra rodar rápido)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetições por benchmark (fica a melhor)")
+    parser.add_argument("--baseline", type=str, default="", help="JSON de baseline pra comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="queda relativa tolerada antes de falhar (0.2 = 20%%)")
+    parser.add_argument("--import-threshold", type=float, default=0.5, dest="import_threshold",
+                        help="queda tolerada nos tempos de import (0.5 = falha só se o import ficar 2x mais lento)")
+    parser.add_argument("--save-baseline", type=str, default="", dest="save_baseline",
+                        help="salva também este resultado como baseline nesse caminho")
+    parser.add_argument("--imports-only", action="store_true", dest="imports_only",
+                        help="mede só o tempo de import dos pontos de entrada")
+    args = parser.parse_args()
+
+    imports = run_import_benchmarks(args.repeat)
+    results = {} if args.imports_only else run_benchmarks(args.scale, args.repeat)
+    #import entra na comparação como "imports/s" (1 / tempo), pra seguir a regra de maior = melhor
+    for module, info in imports.items():
+        results[f"import.{module}"] = {"unit": "imports", "n": 1, "seconds": info["total_ms"] / 1000,
+                                       "per_s": 1000 / info["total_ms"]}
+    report = {
+        "machine": machine_info(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "scale": args.scale,
+        "results": results,
+        "imports": imports,
+    }
+
+    out = args.out or f"bench_{report['machine']['hostname'] or 'local'}.json"
+    for path in filter(None, (out, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[OK] Benchmark salvo em: {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.import_threshold)
+        if regressions:
+            print(f"\n[ERRO] {len(regressions)} benchmark(s) abaixo do limite em relação ao baseline "
+                  f"({1 - args.threshold:.0%}; imports: {1 - args.import_threshold:.0%}).")
+            sys.exit(1)
+        print("\n[OK] Sem regressões.")
+
+if __name__ == "__main__":
+    main()
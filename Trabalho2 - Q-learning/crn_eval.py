@@ -0,0 +1,178 @@
+#avaliação com números aleatórios comuns (CRN): um "baralho" de avaliação fixo, sorteado
+#uma vez e salvo em .npy (aberto com memory-map), onde todas as políticas jogam exatamente
+#as mesmas cartas. Diferenças entre políticas deixam de misturar ruído de amostragem,
+#então comparações pareadas precisam de bem menos episódios, e as cartas não são
+#sorteadas de novo a cada avaliação.
+
+#cada linha do baralho é um episódio com DECK_WIDTH cartas (uint8, 1..10):
+#   0-1   cartas iniciais do jogador
+#   2-3   carta aberta e carta fechada do dealer
+#   4-17  cartas que o jogador compra (pedido t usa a coluna 4 + t % 14)
+#   18-31 cartas que o dealer compra (compra j usa a coluna 18 + j % 14)
+#se um segmento acabar (muito raro: 14+ compras) ele recomeça do início, então o
+#resultado continua determinístico.
+
+#como usar:
+#   python crn_eval.py make decks/deck.npy --episodes 1000000 --seed 10042
+#   python crn_eval.py compare decks/deck.npy qtables/*.npy     # diferença pareada contra a primeira
+
+from __future__ import annotations
+
+import argparse
+import os
+from typing import List, Optional
+
+import numpy as np
+
+from qlearning import greedy_policy, load_qtable, mean_ci_halfwidth, summarize_totals
+
+DECK_WIDTH = 32
+_PLAYER_HITS = 4     #início do segmento de compras do jogador
+_DEALER_DRAWS = 18   #início do segmento de compras do dealer
+_SEGMENT = 14        #cartas por segmento
+
+def deck_path(cache_dir: str, n_episodes: int, seed: int) -> str:
+    #nome do baralho em cache: mesma (n_episodes, seed) -> mesmo arquivo
+    return os.path.join(cache_dir, f"deck_n{n_episodes}_seed{seed}.npy")
+
+def make_deck(path: str, n_episodes: int, seed: int, chunk: int = 1_000_000) -> np.memmap:
+    #sorteia o baralho em blocos (memória fixa) direto num .npy; escreve num temporário e
+    #renomeia no fim, então quem ler nunca vê um arquivo pela metade
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    rng = np.random.default_rng(seed)
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(n_episodes, DECK_WIDTH))
+    for start in range(0, n_episodes, chunk):
+        stop = min(n_episodes, start + chunk)
+        #mesma distribuição do draw_card: 1..13 -> 1..10
+        out[start:stop] = np.minimum(rng.integers(1, 14, size=(stop - start, DECK_WIDTH), dtype=np.uint8), 10)
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    return load_deck(path)
+
+def load_deck(path: str) -> np.memmap:
+    #abre o baralho com memory-map (somente leitura)
+    deck = np.load(path, mmap_mode="r")
+    if deck.dtype != np.uint8 or deck.ndim != 2 or deck.shape[1] != DECK_WIDTH:
+        raise ValueError(f"{path}: não é um baralho de avaliação (esperado uint8 (n, {DECK_WIDTH}))")
+    return deck
+
+def cached_deck(n_episodes: int, seed: int, cache_dir: str = "decks") -> np.memmap:
+    #abre o baralho (n_episodes, seed) do cache; sorteia e salva só na primeira vez
+    path = deck_path(cache_dir, n_episodes, seed)
+    if os.path.exists(path):
+        return load_deck(path)
+    return make_deck(path, n_episodes, seed)
+
+def _dealer_finals(rows: np.ndarray) -> np.ndarray:
+    #total final do dealer em cada episódio (> 21 = estourou). Só depende das cartas,
+    #não das ações do jogador, então é calculado uma vez por bloco para todas as políticas
+    d_raw = rows[:, 2].astype(np.int64) + rows[:, 3]
+    d_ace = (rows[:, 2] == 1) | (rows[:, 3] == 1)
+    d_sum = d_raw + 10 * (d_ace & (d_raw + 10 <= 21))
+    need = d_sum < 17
+    j = 0
+    while need.any():
+        c = rows[need, _DEALER_DRAWS + j % _SEGMENT]
+        d_raw[need] += c
+        d_ace[need] |= c == 1
+        d_sum = d_raw + 10 * (d_ace & (d_raw + 10 <= 21))
+        need = d_sum < 17
+        j += 1
+    return d_sum
+
+def _replay(policies: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    #joga as k políticas (policies[k, N_STATES]) em todos os episódios do bloco, em lockstep.
+    #devolve os retornos (k, len(rows)) em int8
+    k, n = len(policies), len(rows)
+    d_final = _dealer_finals(rows)
+    d_up = rows[:, 2].astype(np.int64)
+    p_raw = np.tile(rows[:, 0].astype(np.int64) + rows[:, 1], (k, 1))
+    p_ace = np.tile((rows[:, 0] == 1) | (rows[:, 1] == 1), (k, 1))
+    G = np.zeros((k, n), dtype=np.int8)
+    owner = np.arange(k)[:, None]
+    active = np.ones((k, n), dtype=bool)
+    t = 0
+    while active.any():
+        usable = p_ace & (p_raw + 10 <= 21)
+        p_sum = p_raw + 10 * usable
+        #mesma codificação do state_index
+        a = policies[owner, (p_sum * 10 + d_up - 1) * 2 + usable]
+        stick = active & (a == 0)
+        if stick.any():
+            d = np.broadcast_to(d_final, (k, n))[stick]
+            ps = p_sum[stick]
+            G[stick] = np.where((d > 21) | (ps > d), 1, np.where(ps < d, -1, 0))
+        hit = active & (a == 1)
+        #todos os jogos ainda ativos pediram t vezes, então usam a mesma coluna
+        c = np.broadcast_to(rows[:, _PLAYER_HITS + t % _SEGMENT], (k, n))[hit]
+        p_raw[hit] += c
+        p_ace[hit] |= c == 1
+        bust = hit & (p_raw > 21)
+        G[bust] = -1
+        active = hit & ~bust
+        t += 1
+    return G
+
+def evaluate_policies_crn(Qs, deck: np.ndarray, baseline: Optional[int] = None, confidence: float = 0.95,
+                          chunk: int = 65_536) -> List[dict]:
+    #avaliação gulosa de várias Q-tables no mesmo baralho (todas jogam as mesmas cartas).
+    #devolve uma lista de dicts no formato do evaluate_policy; com baseline=j cada dict traz
+    #também "diff", "diff_ci_low" e "diff_ci_high": média da diferença pareada por episódio
+    #(política - Qs[j]) e o IC dela, bem mais estreito que o de duas avaliações independentes
+    policies = np.stack([greedy_policy(Q) for Q in Qs])
+    k, n = len(policies), len(deck)
+    if n == 0:
+        raise ValueError("baralho vazio")
+    ret_sum, sq_sum = np.zeros(k), np.zeros(k)
+    wins, losses = np.zeros(k, dtype=np.int64), np.zeros(k, dtype=np.int64)
+    diff_sum, diff_sq = np.zeros(k), np.zeros(k)
+    for start in range(0, n, chunk):
+        G = _replay(policies, np.asarray(deck[start:start + chunk]))
+        g = G.astype(np.float64)
+        ret_sum += g.sum(axis=1)
+        sq_sum += (g * g).sum(axis=1)
+        wins += (G > 0).sum(axis=1)
+        losses += (G < 0).sum(axis=1)
+        if baseline is not None:
+            d = g - g[baseline]
+            diff_sum += d.sum(axis=1)
+            diff_sq += (d * d).sum(axis=1)
+
+    out = []
+    for j in range(k):
+        ev = summarize_totals(n, ret_sum[j], sq_sum[j], wins[j], losses[j], confidence)
+        if baseline is not None:
+            mean = float(diff_sum[j] / n)
+            half = mean_ci_halfwidth(n, diff_sum[j], diff_sq[j], confidence) if j != baseline else 0.0
+            ev.update({"diff": mean, "diff_ci_low": mean - half, "diff_ci_high": mean + half})
+        out.append(ev)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação com números aleatórios comuns (baralho fixo).")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("make", help="sorteia e salva um baralho de avaliação")
+    p.add_argument("path")
+    p.add_argument("--episodes", type=int, default=1_000_000)
+    p.add_argument("--seed", type=int, default=10_042)
+    p = sub.add_parser("compare", help="avalia Q-tables salvas no mesmo baralho (diferença contra a primeira)")
+    p.add_argument("deck")
+    p.add_argument("qtables", nargs="+", help="arquivos .npy do save_qtable")
+    args = parser.parse_args()
+
+    if args.cmd == "make":
+        deck = make_deck(args.path, args.episodes, args.seed)
+        print(f"[OK] Baralho {deck.shape} salvo em: {args.path}")
+        return
+    deck = load_deck(args.deck)
+    Qs = [load_qtable(path)[0] for path in args.qtables]
+    evs = evaluate_policies_crn(Qs, deck, baseline=0)
+    print(f"{len(deck)} episódios por política; diff = avg_return - avg_return de {args.qtables[0]}")
+    for path, ev in zip(args.qtables, evs):
+        print(f"{os.path.basename(path):<50} avg_return={ev['avg_return']:+.4f} "
+              f"diff={ev['diff']:+.4f} [{ev['diff_ci_low']:+.4f}, {ev['diff_ci_high']:+.4f}]")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 #ambiente de Blackjack simplificado
 
-from typing import List, Tuple
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Optional, Tuple
 import random
+import numpy as np
 
-__all__ = ["draw_card", "hand_value", "is_bust", "BlackjackEnv"]
+__all__ = [
+    "draw_card", "hand_value", "is_bust", "BlackjackEnv",
+    "CardStream", "GroupedStream", "sample_cards", "sample_uniform", "N_STATES", "state_index", "state_indices", "VecBlackjackEnv",
+    "FastBlackjackEnv",
+    "CARD_PROBS", "DEALER_OUTCOMES", "dealer_final_distribution", "dealer_outcome_table",
+    "DEALER_MODES",
+]
 
 #utilidades de cartas ----------------------------
 def draw_card() -> int:
@@ -12,6 +21,42 @@ def draw_card() -> int:
     c = random.randint(1, 13)
     return min(c, 10)
 
+class CardStream:
+    """
+    Fonte de cartas de um ambiente: numpy Generator próprio + buffer pré-sorteado.
+    As cartas são sorteadas em blocos (block de cada vez) e consumidas uma a uma,
+    então não mexe no random global e cada ambiente tem sua sequência reprodutível.
+    """
+    __slots__ = ("rng", "block", "_buf", "_pos", "_refills")
+
+    def __init__(self, rng: Optional[np.random.Generator] = None, block: int = 4096):
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.block = int(block)
+        self._buf: List[int] = []
+        self._pos = 0
+        self._refills = 0
+
+    def _refill(self):
+        #mesma distribuição do draw_card: 1..13 -> 1..10
+        self._buf = np.minimum(self.rng.integers(1, 14, size=self.block), 10).tolist()
+        self._pos = 0
+        self._refills += 1
+
+    @property
+    def drawn(self) -> int:
+        #total de cartas já consumidas (sem custo no draw: sai da posição no buffer)
+        return (self._refills - 1) * self.block + self._pos if self._refills else 0
+
+    def draw(self) -> int:
+        if self._pos >= len(self._buf):
+            self._refill()
+        c = self._buf[self._pos]
+        self._pos += 1
+        return c
+
+#distribuição de draw_card: 1..9 com 1/13 cada, 10 com 4/13 (10, J, Q, K)
+CARD_PROBS = {c: (4 / 13 if c == 10 else 1 / 13) for c in range(1, 11)}
+
 def hand_value(cards: List[int]) -> Tuple[int, bool]:
     """
     Retorna (total, usable_ace).
@@ -28,22 +73,118 @@ def is_bust(total: int) -> bool:
     #passou de 21
     return total > 21
 
+#distribuição exata do dealer -------------------
+#resultados finais possíveis do dealer: total 17..21 ou estouro
+DEALER_OUTCOMES = (17, 18, 19, 20, 21, "bust")
+
+def _dealer_from(raw: int, ace: bool, memo: dict) -> np.ndarray:
+    #probabilidades dos resultados finais a partir de (soma crua, tem Ás)
+    key = (raw, ace)
+    if key in memo:
+        return memo[key]
+    total = raw + 10 if ace and raw + 10 <= 21 else raw
+    out = np.zeros(len(DEALER_OUTCOMES))
+    if total > 21:
+        out[-1] = 1.0
+    elif total >= 17:
+        out[total - 17] = 1.0
+    else:
+        for c, p in CARD_PROBS.items():
+            out += p * _dealer_from(raw + c, ace or c == 1, memo)
+    memo[key] = out
+    return out
+
+def dealer_final_distribution(upcard: int) -> np.ndarray:
+    #P(total final = 17..21, estouro) dado a carta aberta do dealer
+    #(a carta fechada é sorteada normalmente, baralho infinito)
+    memo: dict = {}
+    out = np.zeros(len(DEALER_OUTCOMES))
+    for c, p in CARD_PROBS.items():
+        out += p * _dealer_from(upcard + c, upcard == 1 or c == 1, memo)
+    return out
+
+@lru_cache(maxsize=None)
+def dealer_outcome_table() -> np.ndarray:
+    #tabela (11, 6) calculada uma vez só: linha = carta aberta (1..10, linha 0 sem uso),
+    #colunas = DEALER_OUTCOMES. É somente leitura porque fica em cache
+    table = np.zeros((11, len(DEALER_OUTCOMES)))
+    for u in range(1, 11):
+        table[u] = dealer_final_distribution(u)
+    table.setflags(write=False)
+    return table
+
+@lru_cache(maxsize=None)
+def stick_tables():
+    #derivados da tabela do dealer usados no stick:
+    #  cum[u]      -> probabilidades acumuladas (pra sortear o resultado com 1 número)
+    #  expected[u] -> recompensa esperada de parar com total t (t = 0..PLAYER_SUM_MAX)
+    table = dealer_outcome_table()
+    cum = np.cumsum(table, axis=1)
+    cum[:, -1] = 1.0
+    expected = np.zeros((11, PLAYER_SUM_MAX + 1))
+    for u in range(1, 11):
+        for t in range(PLAYER_SUM_MAX + 1):
+            if t > 21:
+                expected[u, t] = -1.0
+                continue
+            win = table[u, -1] + sum(table[u, d - 17] for d in range(17, 22) if d < t)
+            lose = sum(table[u, d - 17] for d in range(17, 22) if d > t)
+            expected[u, t] = win - lose
+    return cum, expected
+
+#como o stick resolve o dealer:
+#  "simulate" -> dealer compra carta por carta (original)
+#  "sample"   -> sorteia uma vez o total final na tabela em cache (mesma distribuição)
+#  "expected" -> devolve direto a recompensa esperada (sem variância do dealer)
+DEALER_MODES = ("simulate", "sample", "expected")
+
+def _check_dealer_mode(mode: str) -> str:
+    if mode not in DEALER_MODES:
+        raise ValueError(f"dealer_mode inválido: {mode!r} (use {', '.join(DEALER_MODES)})")
+    return mode
+
+#codificação densa dos estados -------------------
+#índice = (player_sum * 10 + dealer_up - 1) * 2 + usable_ace
+#player_sum vai até 31 (21 duro + carta 10) pra caber também a obs de estouro
+PLAYER_SUM_MAX = 31
+N_STATES = (PLAYER_SUM_MAX + 1) * 10 * 2
+
+def state_index(state: Tuple[int, int, int]) -> int:
+    #(player_sum, dealer_up, usable_ace) -> índice inteiro
+    p_sum, d_up, ace = state
+    return (p_sum * 10 + d_up - 1) * 2 + ace
+
+def state_indices(obs: np.ndarray) -> np.ndarray:
+    #mesma coisa, mas para um array (n, 3) de observações
+    return (obs[:, 0] * 10 + obs[:, 1] - 1) * 2 + obs[:, 2]
+
 #ambiente -----------------------
 class BlackjackEnv:
     """
     Estado: (player_sum, dealer_upcard, usable_ace[0/1])
     Ações: 0=parar (stick), 1=pedir (hit)
     Recompensa: +1 vitória, 0 empate, -1 derrota (episódio termina)
+    dealer_mode: ver DEALER_MODES (no "expected" a recompensa do stick é fracionária)
+    seed/rng: o ambiente tem seu próprio numpy Generator (o random global não é usado)
     """
-    def __init__(self):
+    def __init__(self, dealer_mode: str = "simulate", seed: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None):
         self.player: List[int] = []
         self.dealer: List[int] = []
         self.done: bool = False
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.cards = CardStream(self.rng)
+        self.dealer_mode = _check_dealer_mode(dealer_mode)
+        if dealer_mode != "simulate":
+            cum, expected = stick_tables()
+            self._dealer_cum = cum.tolist()
+            self._stick_expected = expected.tolist()
 
     def reset(self):
         #começa com duas cartas pra cada
-        self.player = [draw_card(), draw_card()]
-        self.dealer = [draw_card(), draw_card()]
+        draw = self.cards.draw
+        self.player = [draw(), draw()]
+        self.dealer = [draw(), draw()]
         self.done = False
         return self._get_obs()
 
@@ -58,7 +199,7 @@ class BlackjackEnv:
 
         #ação do do jogador
         if action == 1:  # hit
-            self.player.append(draw_card())
+            self.player.append(self.cards.draw())
             p_sum, _ = hand_value(self.player)
             if is_bust(p_sum):
                 self.done = True
@@ -66,11 +207,14 @@ class BlackjackEnv:
                 return self._get_obs(), -1.0, True  #estouro do jogador
             return self._get_obs(), 0.0, False
 
-        #stick -> dealer compra até 17+
         self.done = True
+        if self.dealer_mode != "simulate":
+            return self._stick_from_table()
+
+        #stick -> dealer compra até 17+
         d_sum, _ = hand_value(self.dealer)
         while d_sum < 17:
-            self.dealer.append(draw_card())
+            self.dealer.append(self.cards.draw())
             d_sum, _ = hand_value(self.dealer)
             if is_bust(d_sum):
                 #print("Dealer estourou!")
@@ -81,4 +225,280 @@ class BlackjackEnv:
             return self._get_obs(), +1.0, True
         if p_sum < d_sum:
             return self._get_obs(), -1.0, True
-        return self._get_obs(), 0.0, True
\ No newline at end of file
+        return self._get_obs(), 0.0, True
+
+    def _stick_from_table(self):
+        #stick resolvido pela tabela do dealer, sem o laço de compra
+        p_sum, _ = hand_value(self.player)
+        d_up = self.dealer[0]
+        if self.dealer_mode == "expected":
+            return self._get_obs(), self._stick_expected[d_up][p_sum], True
+        k = bisect_right(self._dealer_cum[d_up], self.rng.random())
+        if k >= 5:
+            return self._get_obs(), +1.0, True  #dealer estourou
+        d_sum = 17 + k
+        if p_sum > d_sum:
+            return self._get_obs(), +1.0, True
+        if p_sum < d_sum:
+            return self._get_obs(), -1.0, True
+        return self._get_obs(), 0.0, True
+
+#ambiente escalar rápido -----------------------
+#observações pré-montadas: _OBS[soma crua][tem Ás][carta do dealer] -> (player_sum, dealer_up, usable_ace)
+_OBS = [[[None] + [(raw + 10 if ace and raw + 10 <= 21 else raw, d_up, int(ace and raw + 10 <= 21))
+                   for d_up in range(1, 11)]
+         for ace in (0, 1)]
+        for raw in range(PLAYER_SUM_MAX + 1)]
+
+class FastBlackjackEnv:
+    """
+    Mesmo jogo e mesma interface do BlackjackEnv, sem alocar nada por passo:
+    guarda só somas cruas + flag de Ás (incremental) e devolve tuplas de _OBS.
+    Com a mesma seed consome as cartas na mesma ordem, então dá exatamente os
+    mesmos episódios do BlackjackEnv.
+    """
+    __slots__ = ("rng", "cards", "_draw", "dealer_mode", "done",
+                 "_p_raw", "_p_ace", "_d_raw", "_d_ace", "_d_up",
+                 "_dealer_cum", "_stick_expected")
+
+    def __init__(self, dealer_mode: str = "simulate", seed: Optional[int] = None,
+                 rng: Optional[np.random.Generator] = None):
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.set_cards(CardStream(self.rng))
+        self.dealer_mode = _check_dealer_mode(dealer_mode)
+        self.done = False
+        self._p_raw = self._p_ace = self._d_raw = self._d_ace = 0
+        self._d_up = 1
+        cum, expected = stick_tables()
+        self._dealer_cum = cum.tolist()
+        self._stick_expected = expected.tolist()
+
+    def set_cards(self, cards: CardStream) -> None:
+        #troca a fonte de cartas (ex.: ao restaurar um checkpoint)
+        self.cards = cards
+        self.rng = cards.rng
+        self._draw = cards.draw
+
+    def reset(self):
+        draw = self._draw
+        p1 = draw()
+        p2 = draw()
+        d1 = draw()
+        d2 = draw()
+        self._p_raw = p1 + p2
+        self._p_ace = 1 if (p1 == 1 or p2 == 1) else 0
+        self._d_up = d1
+        self._d_raw = d1 + d2
+        self._d_ace = 1 if (d1 == 1 or d2 == 1) else 0
+        self.done = False
+        return _OBS[self._p_raw][self._p_ace][d1]
+
+    def step(self, action: int):
+        assert not self.done, "Episódio terminado. Chame reset()."
+
+        if action == 1:  # hit
+            c = self._draw()
+            self._p_raw += c
+            if c == 1:
+                self._p_ace = 1
+            obs = _OBS[self._p_raw][self._p_ace][self._d_up]
+            if self._p_raw > 21:
+                self.done = True
+                return obs, -1.0, True
+            return obs, 0.0, False
+
+        self.done = True
+        p_raw = self._p_raw
+        obs = _OBS[p_raw][self._p_ace][self._d_up]
+        p_sum = obs[0]
+        mode = self.dealer_mode
+        if mode == "expected":
+            return obs, self._stick_expected[self._d_up][p_sum], True
+        if mode == "sample":
+            k = bisect_right(self._dealer_cum[self._d_up], self.rng.random())
+            if k >= 5:
+                return obs, +1.0, True
+            d_sum = 17 + k
+        else:
+            #dealer compra até 17+ (total com Ás contado como 11 quando dá)
+            d_raw, d_ace = self._d_raw, self._d_ace
+            d_sum = d_raw + 10 if d_ace and d_raw <= 11 else d_raw
+            draw = self._draw
+            while d_sum < 17:
+                c = draw()
+                d_raw += c
+                if c == 1:
+                    d_ace = 1
+                d_sum = d_raw + 10 if d_ace and d_raw <= 11 else d_raw
+                if d_sum > 21:
+                    self._d_raw, self._d_ace = d_raw, d_ace
+                    return obs, +1.0, True
+            self._d_raw, self._d_ace = d_raw, d_ace
+
+        if p_sum > d_sum:
+            return obs, +1.0, True
+        if p_sum < d_sum:
+            return obs, -1.0, True
+        return obs, 0.0, True
+
+#ambiente vetorizado -----------------------
+def sample_cards(rng: np.random.Generator, n: int) -> np.ndarray:
+    #n cartas de uma vez: 1..13 -> 1..10
+    return np.minimum(rng.integers(1, 14, size=n), 10)
+
+def sample_uniform(rng: np.random.Generator, n: int) -> np.ndarray:
+    #n uniformes em [0, 1)
+    return rng.random(n)
+
+class GroupedStream:
+    """
+    Valores pré-sorteados para grupos de jogos (versão vetorizada do CardStream): cada grupo
+    tem seu Generator e um bloco próprio, consumido em ordem. take(owner) devolve um valor por
+    entrada de owner (índice do grupo, em ordem crescente) numa operação só, sem laço por grupo,
+    e a sequência de um grupo só depende do que ele mesmo consumiu, não dos outros grupos.
+    block precisa ser >= o maior pedido de um grupo num take.
+    """
+    __slots__ = ("rngs", "sample", "block", "buf", "pos", "_one")
+
+    def __init__(self, rngs, sample, block: int = 4096):
+        self.rngs = list(rngs)
+        self.sample = sample
+        self.block = int(block)
+        self.buf = np.stack([sample(r, self.block) for r in self.rngs])
+        self.pos = np.zeros(len(self.rngs), dtype=np.int64)
+        self._one = len(self.rngs) == 1
+
+    def _refill(self, c: int):
+        #o que sobrou vai pro começo do bloco e o resto é sorteado de novo
+        p = int(self.pos[c])
+        self.buf[c, :self.block - p] = self.buf[c, p:]
+        self.buf[c, self.block - p:] = self.sample(self.rngs[c], p)
+        self.pos[c] = 0
+
+    def take(self, owner: np.ndarray) -> np.ndarray:
+        if self._one:
+            #um grupo só: fatia direta
+            n = len(owner)
+            if self.pos[0] + n > self.block:
+                self._refill(0)
+            p = int(self.pos[0])
+            self.pos[0] = p + n
+            return self.buf[0, p:p + n]
+        counts = np.bincount(owner, minlength=len(self.rngs))
+        for c in np.flatnonzero(self.pos + counts > self.block):
+            self._refill(c)
+        #o j-ésimo pedido do grupo g sai de buf[g, pos[g] + j]; em índice plano, o início de
+        #cada grupo menos a posição do seu primeiro pedido em owner
+        start = np.arange(len(self.rngs)) * self.block + self.pos - (np.cumsum(counts) - counts)
+        self.pos += counts
+        return self.buf.reshape(-1)[start[owner] + np.arange(len(owner))]
+
+class VecBlackjackEnv:
+    """
+    N jogos independentes rodando em paralelo com arrays NumPy.
+    Mesmas regras do BlackjackEnv (baralho infinito, dealer compra até 17).
+    Observações: array (n, 3) com colunas (player_sum, dealer_upcard, usable_ace).
+    step(actions) devolve (obs, rewards, dones); jogos terminados são
+    reiniciados automaticamente, então a obs de quem terminou já é a do novo jogo.
+    seed pode ser uma lista: aí os n_envs jogos são divididos em len(seed) grupos seguidos,
+    cada um com cartas do seu próprio Generator (GroupedStream), e os jogos de um grupo
+    saem iguais aos de um VecBlackjackEnv(n_envs // len(seed), seed=seed[g]) sozinho.
+    """
+    def __init__(self, n_envs: int, seed=None, dealer_mode: str = "simulate"):
+        self.n_envs = int(n_envs)
+        seeds = list(seed) if isinstance(seed, (list, tuple)) else [seed]
+        if self.n_envs % len(seeds):
+            raise ValueError(f"n_envs={n_envs} não divide em {len(seeds)} grupos iguais")
+        m = self.n_envs // len(seeds)
+        rngs = [np.random.default_rng(s) for s in seeds]
+        self.owner = np.repeat(np.arange(len(seeds)), m)
+        #reset pede 4 cartas por jogo, então o bloco cabe pelo menos isso por grupo
+        self._cards = GroupedStream(rngs, sample_cards, max(65536, 4 * m))
+        self._uniform = GroupedStream(rngs, sample_uniform, max(65536, m))
+        self.dealer_mode = _check_dealer_mode(dealer_mode)
+        n = self.n_envs
+        #somas "cruas" (Ás vale 1) + flag de Ás na mão
+        self.p_raw = np.zeros(n, dtype=np.int64)
+        self.p_ace = np.zeros(n, dtype=bool)
+        self.d_raw = np.zeros(n, dtype=np.int64)
+        self.d_ace = np.zeros(n, dtype=bool)
+        self.d_up = np.ones(n, dtype=np.int64)
+
+    def _draw(self, mask: np.ndarray) -> np.ndarray:
+        #uma carta pra cada jogo em mask, do bloco do grupo dele
+        return self._cards.take(self.owner[mask])
+
+    @staticmethod
+    def _totals(raw: np.ndarray, ace: np.ndarray):
+        #versão vetorizada de hand_value
+        usable = ace & (raw + 10 <= 21)
+        return raw + 10 * usable, usable
+
+    def _reset_where(self, mask: np.ndarray):
+        k = int(mask.sum())
+        if k == 0:
+            return
+        c = self._cards.take(np.repeat(self.owner[mask], 4)).reshape(k, 4).T
+        self.p_raw[mask] = c[0] + c[1]
+        self.p_ace[mask] = (c[0] == 1) | (c[1] == 1)
+        self.d_up[mask] = c[2]
+        self.d_raw[mask] = c[2] + c[3]
+        self.d_ace[mask] = (c[2] == 1) | (c[3] == 1)
+
+    def _get_obs(self) -> np.ndarray:
+        p_sum, usable = self._totals(self.p_raw, self.p_ace)
+        return np.stack([p_sum, self.d_up, usable.astype(np.int64)], axis=1)
+
+    def reset(self) -> np.ndarray:
+        self._reset_where(np.ones(self.n_envs, dtype=bool))
+        return self._get_obs()
+
+    def step(self, actions: np.ndarray):
+        actions = np.asarray(actions)
+        rewards = np.zeros(self.n_envs, dtype=np.float32)
+        hit = actions == 1
+        stick = ~hit
+
+        #hit: uma carta pra cada jogo que pediu
+        if hit.any():
+            c = self._draw(hit)
+            self.p_raw[hit] += c
+            self.p_ace[hit] |= c == 1
+        bust = hit & (self.p_raw > 21)
+        rewards[bust] = -1.0
+
+        #stick pela tabela do dealer (sem laço)
+        if self.dealer_mode != "simulate" and stick.any():
+            cum, expected = stick_tables()
+            p_sum, _ = self._totals(self.p_raw[stick], self.p_ace[stick])
+            d_up = self.d_up[stick]
+            if self.dealer_mode == "expected":
+                rewards[stick] = expected[d_up, p_sum]
+            else:
+                u = self._uniform.take(self.owner[stick])
+                k = (u[:, None] >= cum[d_up]).sum(axis=1)
+                d_sum = 17 + k
+                d_bust = k >= 5
+                rewards[stick] = np.where(d_bust | (p_sum > d_sum), 1.0,
+                                          np.where(p_sum < d_sum, -1.0, 0.0))
+
+        #stick: dealer compra até 17+ em todos os jogos que pararam
+        elif stick.any():
+            d_sum, _ = self._totals(self.d_raw, self.d_ace)
+            need = stick & (d_sum < 17)
+            while need.any():
+                c = self._draw(need)
+                self.d_raw[need] += c
+                self.d_ace[need] |= c == 1
+                d_sum, _ = self._totals(self.d_raw, self.d_ace)
+                need = stick & (d_sum < 17)
+            p_sum, _ = self._totals(self.p_raw, self.p_ace)
+            d_bust = d_sum > 21
+            win = stick & (d_bust | (p_sum > d_sum))
+            lose = stick & ~d_bust & (p_sum < d_sum)
+            rewards[win] = 1.0
+            rewards[lose] = -1.0
+
+        dones = bust | stick
+        self._reset_where(dones)
+        return self._get_obs(), rewards, dones
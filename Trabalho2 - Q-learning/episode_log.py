@@ -0,0 +1,206 @@
+#log de episódios em disco + treino offline: separa a geração de experiência do aprendizado.
+#o log é um .npy estruturado (LOG_DTYPE) com uma transição por linha, os episódios em
+#sequência (o próximo estado de uma transição com done=False é o estado da linha seguinte),
+#mais um .json com formato/versão e como o log foi gravado.
+#com o mesmo log dá pra treinar várias Q-tables (alphas/gammas diferentes) numa passada só,
+#todas vendo exatamente a mesma experiência e sem custo de simulação.
+
+#como usar:
+#   python episode_log.py record logs/random_1m --episodes 1000000 --seed 7
+#   python episode_log.py record logs/eps01 --episodes 500000 --behavior-q qtables/qtable_....npy --epsilon 0.1
+#   python episode_log.py replay logs/random_1m --alphas 0.005,0.01,0.02,0.05 --gammas 1.0 --epochs 2
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from env_blackjack import DEALER_MODES, N_STATES, VecBlackjackEnv, state_indices
+from qlearning import QTable, State, greedy_policy
+
+LOG_FORMAT = "blackjack-episode-log"
+LOG_VERSION = 1
+#state = state_index(s); reward em float32 porque no dealer_mode "expected" ela é fracionária
+LOG_DTYPE = np.dtype([("state", "<i2"), ("action", "i1"), ("done", "?"), ("reward", "<f4")])
+
+def _log_paths(path: str) -> Tuple[str, str]:
+    #"run" / "run.npy" -> ("run.npy", "run.json")
+    base = path[:-4] if path.endswith(".npy") else path
+    return base + ".npy", base + ".json"
+
+def record_episodes(n_episodes: int, seed: int = 0, n_envs: int = 4096, dealer_mode: str = "simulate",
+                    Q: Optional[Mapping[State, np.ndarray]] = None, epsilon: float = 1.0) -> np.ndarray:
+    #joga n_episodes num VecBlackjackEnv e devolve o log (array LOG_DTYPE) com os episódios em sequência.
+    #política de comportamento: ε-gulosa na Q dada (sem Q = aleatória uniforme). Q-learning é
+    #off-policy, então qualquer comportamento que visite os estados serve pro treino offline.
+    #cada jogo do env vira uma coluna (T, n_envs); as colunas são concatenadas uma depois da
+    #outra (cada uma já tem os episódios em ordem, por causa do reset automático) e o pedaço
+    #final de cada coluna, de um episódio que não terminou, é descartado
+    if n_episodes <= 0:
+        raise ValueError("n_episodes precisa ser > 0")
+    env_seed, agent_seed = np.random.SeedSequence(seed).spawn(2)
+    rng = np.random.default_rng(agent_seed)
+    n_envs = max(1, min(n_envs, n_episodes))
+    env = VecBlackjackEnv(n_envs, seed=env_seed, dealer_mode=dealer_mode)
+    policy = greedy_policy(Q) if Q is not None else np.zeros(N_STATES, dtype=np.int8)
+
+    states, actions, dones, rewards = [], [], [], []
+    n_done = 0
+    idx = state_indices(env.reset())
+    while n_done < n_episodes:
+        a = np.where(rng.random(n_envs) < epsilon, rng.integers(0, 2, size=n_envs), policy[idx])
+        obs, r, done = env.step(a)
+        states.append(idx.astype(np.int16))
+        actions.append(a.astype(np.int8))
+        dones.append(done)
+        rewards.append(r)
+        n_done += int(done.sum())
+        idx = state_indices(obs)
+
+    #(T, n_envs) -> (n_envs, T): cada linha é a sequência de um jogo
+    D = np.stack(dones, axis=1)
+    T = D.shape[1]
+    last = T - 1 - np.argmax(D[:, ::-1], axis=1)
+    keep = (np.arange(T)[None, :] <= last[:, None]) & D.any(axis=1)[:, None]
+    log = np.empty(int(keep.sum()), dtype=LOG_DTYPE)
+    log["state"] = np.stack(states, axis=1)[keep]
+    log["action"] = np.stack(actions, axis=1)[keep]
+    log["done"] = D[keep]
+    log["reward"] = np.stack(rewards, axis=1)[keep]
+    #corta no n_episodes-ésimo episódio completo
+    end = int(np.searchsorted(np.cumsum(log["done"]), n_episodes)) + 1
+    return log[:end]
+
+def save_episode_log(path: str, log: np.ndarray, meta: Optional[dict] = None) -> str:
+    #<base>.npy com as transições + <base>.json com formato/versão e metadados; devolve o .npy
+    npy_path, json_path = _log_paths(path)
+    os.makedirs(os.path.dirname(os.path.abspath(npy_path)), exist_ok=True)
+    sidecar = {
+        "format": LOG_FORMAT,
+        "version": LOG_VERSION,
+        "transitions": int(len(log)),
+        "episodes": int(log["done"].sum()),
+        "meta": meta or {},
+    }
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, log)
+    with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    os.replace(npy_path + ".tmp", npy_path)
+    os.replace(json_path + ".tmp", json_path)
+    return npy_path
+
+def load_episode_log(path: str, mmap: bool = True) -> Tuple[np.ndarray, dict]:
+    #lê o que o save_episode_log gravou: (log, sidecar); com mmap=True o log fica mapeado do arquivo
+    npy_path, json_path = _log_paths(path)
+    with open(json_path, encoding="utf-8") as f:
+        sidecar = json.load(f)
+    if sidecar.get("format") != LOG_FORMAT or sidecar.get("version") != LOG_VERSION:
+        raise ValueError(f"{json_path}: formato {sidecar.get('format')} v{sidecar.get('version')} "
+                         f"não suportado (esperado {LOG_FORMAT} v{LOG_VERSION})")
+    log = np.load(npy_path, mmap_mode="r" if mmap else None)
+    if log.dtype != LOG_DTYPE:
+        raise ValueError(f"{npy_path}: dtype {log.dtype}, esperado {LOG_DTYPE}")
+    return log, sidecar
+
+def _lane_schedule(done: np.ndarray, n_lanes: int) -> np.ndarray:
+    #distribui os episódios entre n_lanes pistas (episódio e -> pista e % n_lanes, na ordem do log)
+    #e devolve schedule[passo, pista] = índice da transição (-1 quando a pista já acabou)
+    ends = np.flatnonzero(done)
+    lens = np.diff(np.concatenate(([-1], ends)))
+    lane = np.repeat(np.arange(len(ends)) % n_lanes, lens)
+    order = np.argsort(lane, kind="stable")
+    counts = np.bincount(lane, minlength=n_lanes)
+    pos = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+    schedule = np.full((int(counts.max()), n_lanes), -1, dtype=np.int64)
+    schedule[pos, lane[order]] = order
+    return schedule
+
+def train_offline(log: np.ndarray, alpha, gamma=1.0, n_lanes: int = 1024, epochs: int = 1) -> List[QTable]:
+    #Q-learning offline: repassa as transições do log em várias Q-tables ao mesmo tempo
+    #(q[config, estado, ação]); alpha/gamma podem ser escalares ou um valor por configuração.
+    #os episódios são divididos em n_lanes pistas, e cada passo atualiza uma transição de cada
+    #pista em todas as configurações de uma vez. Com n_lanes=1 é o Q-learning sequencial exato
+    #sobre o log (lento: um passo numpy por transição); com n_lanes>1 vale a última escrita quando
+    #duas pistas atualizam o mesmo (s, a) no mesmo passo, como no treino vetorizado.
+    #epochs > 1 repassa o log inteiro de novo. Devolve uma QTable por configuração
+    alpha, gamma = (np.atleast_1d(x).astype(np.float32) for x in
+                    np.broadcast_arrays(np.asarray(alpha, dtype=np.float64), np.asarray(gamma, dtype=np.float64)))
+    k = len(alpha)
+    state = np.asarray(log["state"], dtype=np.int64)
+    action = np.asarray(log["action"], dtype=np.int64)
+    done = np.asarray(log["done"], dtype=bool)
+    reward = np.asarray(log["reward"], dtype=np.float32)
+    if len(log) == 0 or not done[-1]:
+        raise ValueError("log vazio ou terminando no meio de um episódio")
+    #próximo estado: linha seguinte (só usado quando done=False, e aí ela é do mesmo episódio)
+    next_state = np.append(state[1:], 0)
+    schedule = _lane_schedule(done, max(1, min(n_lanes, int(done.sum()))))
+
+    q = np.zeros((k, N_STATES, 2), dtype=np.float32)
+    cfg = np.arange(k)[:, None]
+    alpha_c, gamma_c = alpha[:, None], gamma[:, None]
+    for _ in range(epochs):
+        for row in schedule:
+            t = row[row >= 0]
+            s, a, d = state[t], action[t], done[t]
+            bootstrap = np.where(d, 0.0, q[:, next_state[t]].max(axis=2))
+            target = reward[t] + gamma_c * bootstrap
+            q[cfg, s, a] += alpha_c * (target - q[cfg, s, a])
+    return [QTable(q[c].copy()) for c in range(k)]
+
+def main():
+    from qlearning import evaluate_policy_exact, load_qtable, save_qtable
+    from solver import q_star_distance
+
+    parser = argparse.ArgumentParser(description="Log de episódios e treino offline (várias Q-tables no mesmo log).")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("record", help="grava um log de episódios")
+    p.add_argument("path")
+    p.add_argument("--episodes", type=int, default=1_000_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--n-envs", type=int, default=4096, dest="n_envs")
+    p.add_argument("--dealer-mode", type=str, default="simulate", choices=DEALER_MODES, dest="dealer_mode")
+    p.add_argument("--behavior-q", type=str, default="", dest="behavior_q",
+                   help="Q salva (save_qtable) usada no comportamento ε-guloso; vazio = aleatório")
+    p.add_argument("--epsilon", type=float, default=1.0, help="exploração do comportamento (1.0 = aleatório)")
+    p = sub.add_parser("replay", help="treina várias Q-tables no mesmo log")
+    p.add_argument("path")
+    p.add_argument("--alphas", type=str, default="0.01,0.02,0.05,0.1")
+    p.add_argument("--gammas", type=str, default="1.0")
+    p.add_argument("--lanes", type=int, default=1024, help="episódios processados em paralelo (1 = sequencial exato)")
+    p.add_argument("--epochs", type=int, default=1)
+    p.add_argument("--save-qtables", type=str, default="", dest="save_qtables",
+                   help="pasta onde salvar a Q de cada configuração (vazio = não salva)")
+    args = parser.parse_args()
+
+    if args.cmd == "record":
+        Q = load_qtable(args.behavior_q)[0] if args.behavior_q else None
+        log = record_episodes(args.episodes, args.seed, args.n_envs, args.dealer_mode, Q, args.epsilon)
+        meta = {"seed": args.seed, "n_envs": args.n_envs, "dealer_mode": args.dealer_mode,
+                "behavior_q": args.behavior_q, "epsilon": args.epsilon}
+        path = save_episode_log(args.path, log, meta)
+        print(f"[OK] {int(log['done'].sum())} episódios ({len(log)} transições) salvos em: {path}")
+        return
+
+    log, info = load_episode_log(args.path)
+    configs = [(float(a), float(g)) for g in args.gammas.split(",") for a in args.alphas.split(",")]
+    Qs = train_offline(log, [a for a, _ in configs], [g for _, g in configs], args.lanes, args.epochs)
+    print(f"{info['episodes']} episódios x {args.epochs} época(s), {len(configs)} configurações")
+    for (alpha, gamma), Q in zip(configs, Qs):
+        ev = evaluate_policy_exact(Q)
+        print(f"alpha={alpha:<7} gamma={gamma:<5} avg_return={ev['avg_return']:+.4f} "
+              f"|Q-Q*|={q_star_distance(Q, gamma=gamma):.4f}")
+        if args.save_qtables:
+            os.makedirs(args.save_qtables, exist_ok=True)
+            name = f"qtable_offline_alpha{alpha}_gamma{gamma}_epochs{args.epochs}.npy"
+            save_qtable(os.path.join(args.save_qtables, name), Q,
+                        {"alpha": alpha, "gamma": gamma, "epochs": args.epochs, "lanes": args.lanes,
+                         "episode_log": args.path, **info["meta"]})
+
+if __name__ == "__main__":
+    main()
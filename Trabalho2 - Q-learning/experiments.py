@@ -4,18 +4,43 @@
 #como usar:
 #   python experiments.py --alphas 0.05,0.1,0.2 --episodes 50000,100000,200000 --gammas 1.0 --repeats 2
 #   python experiments.py --save-curves --out results.csv
+#   python experiments.py --workers 8 --repeats 4
+#   python experiments.py --resume --checkpoint-dir ckpt --out results.csv
+#   python experiments.py --eval-ci 0.005 --eval-episodes 1000000
+#   python experiments.py --eval-mode crn --eval-episodes 200000
+#   python experiments.py --save-qtables qtables
+#   python experiments.py --db results.db --repeats 5
+#   python experiments.py --batched-train 256 --alphas 0.02,0.05,0.1,0.2 --episodes 200000 --repeats 3
+#   python experiments.py --search halving --alphas 0.01,0.02,0.05,0.1,0.2,0.3 --min-episodes 20000 --max-episodes 540000
 
 from __future__ import annotations
 
 import argparse
 import csv
 import itertools
+import math
 import os
 import time
 from typing import List
 
-from qlearning import train_q_learning, evaluate_policy
-from analysis_utils import save_learning_curve  # opcional, funciona mesmo sem matplotlib
+from env_blackjack import DEALER_MODES
+from qlearning import (
+    train_q_learning, train_q_learning_batched, evaluate_policy, evaluate_policy_exact, evaluate_policies_batched, profile_report,
+    save_qtable,
+)
+from analysis_utils import curve_data, save_curve_data
+from crn_eval import cached_deck, deck_path, evaluate_policies_crn, load_deck
+from results_db import add_result, connect
+from solver import q_star_distance
+
+CSV_HEADER = [
+    "alpha", "gamma", "episodes", "eps_start", "eps_end", "eps_decay", "seed",
+    "win_rate", "draw_rate", "loss_rate", "avg_return",
+    "wins", "losses", "draws",
+    "train_time_s", "eval_time_s", "curve_path",
+    "stopped_episode", "stop_reason", "rung",
+    "eval_episodes", "ci_low", "ci_high", "qtable_path", "q_star_dist",
+]
 
 def _parse_float_list(s: str) -> List[float]:
     #transforma string tipo "0.1,0.2" em lista de floats
@@ -25,6 +50,272 @@ def _parse_int_list(s: str) -> List[int]:
     #transforma string tipo "100,200" em lista de ints
     return [int(x.strip()) for x in s.split(",") if x.strip()]
 
+def _job_key(alpha, gamma, episodes, seed):
+    #chave usada pra saber se uma configuração já está no CSV
+    return (float(alpha), float(gamma), int(episodes), int(seed))
+
+def _done_keys(path: str) -> set:
+    #lê o CSV existente e devolve as chaves (alpha, gamma, episodes, seed) já rodadas
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                done.add(_job_key(row["alpha"], row["gamma"], row["episodes"], row["seed"]))
+            except (KeyError, ValueError):
+                continue  #linha incompleta (execução morta no meio da escrita)
+    return done
+
+def _checkpoint_path(ckpt_dir: str, job) -> str:
+    if not ckpt_dir:
+        return ""
+    name = f"ckpt_alpha{job['alpha']}_gamma{job['gamma']}_eps{job['episodes']}_seed{job['seed']}.pkl"
+    return os.path.join(ckpt_dir, name)
+
+def _job_title(job) -> str:
+    return (f"== Rodando: alpha={job['alpha']}, gamma={job['gamma']}, "
+            f"episodes={job['episodes']}, seed={job['seed']} ==")
+
+def _train_job(job):
+    #só o treino (+ curva) de uma configuração; roda no processo principal ou num worker.
+    #devolve Q e um resumo enxuto do stats (sem os arrays grandes)
+    alpha, gamma, n_episodes, seed = job["alpha"], job["gamma"], job["episodes"], job["seed"]
+
+    t0 = time.perf_counter()
+    Q, stats = train_q_learning(
+        num_episodes=n_episodes,
+        alpha=alpha,
+        gamma=gamma,
+        eps_start=job["eps_start"],
+        eps_end=job["eps_end"],
+        eps_decay=job["eps_decay"],
+        seed=seed,
+        n_envs=job["n_envs"],
+        checkpoint_path=job["checkpoint_path"] or None,
+        checkpoint_every=job["checkpoint_every"],
+        dealer_mode=job["dealer_mode"],
+        curve_points=job["curve_points"],
+        check_every=job["check_every"],
+        q_tol=job["q_tol"],
+        policy_patience=job["policy_patience"],
+        plateau_tol=job["plateau_tol"],
+        profile=job["profile"],
+        n_actors=job["n_actors"],
+    )
+    return _finish_job(job, Q, stats, time.perf_counter() - t0)
+
+def _finish_job(job, Q, stats, train_time):
+    #salva curva/Q-table do job (se pedido) e monta o resumo enxuto do treino
+    alpha, gamma, n_episodes, seed = job["alpha"], job["gamma"], job["episodes"], job["seed"]
+    curve_path = ""
+    if job["curves_dir"]:
+        #só os dados (.npz); os PNGs saem depois com o render_curves.py
+        curve_name = f"curve_alpha{alpha}_gamma{gamma}_eps{n_episodes}_seed{seed}.npz"
+        curve_path = os.path.join(job["curves_dir"], curve_name)
+        try:
+            rewards, block = curve_data(stats)
+            save_curve_data(rewards, curve_path, block=block,
+                            label=f"alpha={alpha} gamma={gamma} eps={n_episodes} seed={seed}")
+        except Exception as e:
+            print(f"[Aviso] Falha ao salvar curva ({e}). Prosseguindo sem curva.")
+            curve_path = ""
+
+    qtable_path = ""
+    if job["qtables_dir"]:
+        #Q (.npy, pode ser aberta com mmap) + .json com hiperparâmetros e política
+        qtable_name = f"qtable_alpha{alpha}_gamma{gamma}_eps{n_episodes}_seed{seed}.npy"
+        meta = {k: job[k] for k in ("alpha", "gamma", "episodes", "eps_start", "eps_end", "eps_decay",
+                                    "seed", "n_envs", "dealer_mode")}
+        meta.update({k: stats[k] for k in ("wins", "losses", "draws", "stopped_episode", "stop_reason")})
+        meta["train_time_s"] = round(train_time, 4)
+        qtable_path = save_qtable(os.path.join(job["qtables_dir"], qtable_name), Q, meta)
+
+    keep = ("wins", "losses", "draws", "stopped_episode", "stop_reason", "profile")
+    return {"Q": Q, "stats": {k: stats[k] for k in keep if k in stats},
+            "train_time": train_time, "curve_path": curve_path, "qtable_path": qtable_path}
+
+def _evaluate_job(job, Q):
+    #avalia a Q de um job (exata ou Monte Carlo); devolve (ev, eval_time)
+    t0 = time.perf_counter()
+    if job["eval_mode"] == "exact":
+        ev = evaluate_policy_exact(Q)
+    elif job["eval_mode"] == "crn":
+        #baralho fixo em memory-map (já criado no main); todas as Qs jogam as mesmas cartas
+        ev = evaluate_policies_crn([Q], load_deck(job["eval_deck"]))[0]
+    else:
+        ev = evaluate_policy(Q, n_episodes=job["eval_episodes"], seed=job["seed"] + 10_000,
+                             n_envs=job["n_envs"], profile=job["profile"],
+                             ci_halfwidth=job["eval_ci"] or None, batch_size=job["eval_batch"])
+    return ev, time.perf_counter() - t0
+
+def _run_job(job):
+    #treina + avalia uma configuração; devolve a linha do CSV, o resumo pra imprimir e a avaliação
+    res = _train_job(job)
+    ev, eval_time = _evaluate_job(job, res["Q"])
+    return (*_make_row(job, res, ev, eval_time), ev)
+
+def _train_jobs_batched(jobs, games_per_config):
+    #treina todos os jobs numa execução vetorizada só (train_q_learning_batched): cada job vira
+    #uma "configuração" com alpha/gamma/ε/episódios/seed próprios (o resultado de um job não depende
+    #dos outros do lote, então --resume refaz a mesma linha). train_time é o total dividido pelos jobs
+    first = jobs[0]
+    t0 = time.perf_counter()
+    outs = train_q_learning_batched(
+        num_episodes=[job["episodes"] for job in jobs],
+        alpha=[job["alpha"] for job in jobs],
+        gamma=[job["gamma"] for job in jobs],
+        eps_start=[job["eps_start"] for job in jobs],
+        eps_end=[job["eps_end"] for job in jobs],
+        eps_decay=[job["eps_decay"] for job in jobs],
+        seed=[job["seed"] for job in jobs],
+        n_envs=games_per_config,
+        dealer_mode=first["dealer_mode"],
+        curve_points=first["curve_points"],
+    )
+    train_time = (time.perf_counter() - t0) / len(jobs)
+    return [_finish_job(job, Q, stats, train_time) for job, (Q, stats) in zip(jobs, outs)]
+
+def _make_row(job, res, ev, eval_time):
+    alpha, gamma, n_episodes, seed = job["alpha"], job["gamma"], job["episodes"], job["seed"]
+    stats, train_time, curve_path = res["stats"], res["train_time"], res["curve_path"]
+    #distância até a Q* do solver (erro absoluto médio nos estados de decisão)
+    q_dist = q_star_distance(res["Q"], gamma=gamma)
+    row = [
+        alpha, gamma, n_episodes, job["eps_start"], job["eps_end"], job["eps_decay"], seed,
+        ev["win_rate"], ev["draw_rate"], ev["loss_rate"], ev["avg_return"],
+        stats["wins"], stats["losses"], stats["draws"],
+        round(train_time, 4), round(eval_time, 4), curve_path,
+        stats["stopped_episode"], stats["stop_reason"], job.get("rung", ""),
+        ev["episodes"], ev["ci_low"], ev["ci_high"], res["qtable_path"], q_dist,
+    ]
+    #também monta um resumo pro terminal
+    summary = (f"  -> win={ev['win_rate']:.4f} draw={ev['draw_rate']:.4f} "
+               f"loss={ev['loss_rate']:.4f} avg_return={ev['avg_return']:.4f} "
+               f"[{ev['ci_low']:.4f}, {ev['ci_high']:.4f}] |Q-Q*|={q_dist:.4f} "
+               f"| wins={stats['wins']} losses={stats['losses']} draws={stats['draws']} "
+               f"| stop={stats['stop_reason']}@{stats['stopped_episode']} "
+               f"| train_time={train_time:.2f}s eval_time={eval_time:.2f}s")
+    if curve_path:
+        summary += f"\n  -> dados da curva salvos em: {curve_path}"
+    if "profile" in stats:
+        summary += "\n  [treino]\n" + profile_report(stats["profile"])
+    if "profile" in ev:
+        summary += "\n  [avaliação]\n" + profile_report(ev["profile"])
+    return row, summary
+
+def _write_row(f, writer, job, row, db=None):
+    #grava a linha já no disco (e no banco, se --db); só depois disso o checkpoint do job pode sumir
+    writer.writerow(row)
+    f.flush()
+    if db is not None:
+        add_result(db, {**dict(zip(CSV_HEADER, row)), "dealer_mode": job["dealer_mode"]}, job["eval_mode"])
+    if job["checkpoint_path"] and os.path.exists(job["checkpoint_path"]):
+        os.remove(job["checkpoint_path"])
+
+def _make_job(args, alpha, gamma, n_episodes, seed, rung=""):
+    job = {
+        "alpha": alpha, "gamma": gamma, "episodes": n_episodes, "seed": seed, "rung": rung,
+        "eps_start": args.eps_start, "eps_end": args.eps_end, "eps_decay": args.eps_decay,
+        "eval_episodes": args.eval_episodes, "eval_mode": args.eval_mode, "n_envs": args.n_envs,
+        "eval_ci": args.eval_ci, "eval_batch": args.eval_batch, "eval_deck": args.eval_deck,
+        "dealer_mode": args.dealer_mode, "curve_points": args.curve_points,
+        "check_every": args.check_every, "q_tol": args.q_tol,
+        "policy_patience": args.policy_patience, "plateau_tol": args.plateau_tol,
+        "profile": args.profile, "n_actors": args.actors,
+        "curves_dir": args.curves_dir if args.save_curves else "",
+        "qtables_dir": args.save_qtables,
+    }
+    job["checkpoint_path"] = _checkpoint_path(args.checkpoint_dir, job)
+    job["checkpoint_every"] = args.checkpoint_every if args.checkpoint_dir else 0
+    return job
+
+def _pool(workers: int):
+    #concurrent.futures/multiprocessing só são importados quando --workers > 1
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers)
+
+def _iter_results(jobs, args):
+    #roda os jobs (serial, no pool ou com avaliação em lote) e devolve
+    #(job, row, summary, ev) na ordem dos jobs, conforme vão ficando prontos
+    if args.batched_train and jobs:
+        #treina todas as configurações juntas (um laço vetorizado só) e depois avalia cada uma
+        print(f"== Treino em lote: {len(jobs)} configurações x {args.batched_train} jogos ==")
+        results = _train_jobs_batched(jobs, args.batched_train)
+        if args.eval_mode == "batched":
+            t0 = time.perf_counter()
+            evs = evaluate_policies_batched([res["Q"] for res in results], n_episodes=args.eval_episodes,
+                                            seed=args.base_seed + 10_000,
+                                            n_envs=args.n_envs if args.n_envs > 1 else 4096)
+            eval_time = (time.perf_counter() - t0) / len(jobs)
+            evals = [(ev, eval_time) for ev in evs]
+        else:
+            evals = (_evaluate_job(job, res["Q"]) for job, res in zip(jobs, results))
+        for job, res, (ev, eval_time) in zip(jobs, results, evals):
+            print(_job_title(job))
+            yield (job, *_make_row(job, res, ev, eval_time), ev)
+    elif args.eval_mode == "batched":
+        #treina tudo (serial ou no pool) e avalia todas as Qs numa passada vetorizada só;
+        #todas jogam com a mesma seed e o eval_time é o tempo total dividido pelos jobs
+        print(f"== Treinando {len(jobs)} configurações ==")
+        if args.workers > 1:
+            with _pool(args.workers) as pool:
+                results = list(pool.map(_train_job, jobs))
+        else:
+            results = [_train_job(job) for job in jobs]
+        print(f"== Avaliação em lote: {len(jobs)} políticas ==")
+        t0 = time.perf_counter()
+        evs = evaluate_policies_batched([res["Q"] for res in results], n_episodes=args.eval_episodes,
+                                        seed=args.base_seed + 10_000,
+                                        n_envs=args.n_envs if args.n_envs > 1 else 4096)
+        eval_time = (time.perf_counter() - t0) / max(1, len(jobs))
+        for job, res, ev in zip(jobs, results, evs):
+            print(_job_title(job))
+            yield (job, *_make_row(job, res, ev, eval_time), ev)
+    elif args.workers > 1:
+        #cada job roda num processo; map devolve na ordem dos jobs, então o CSV
+        #sai na mesma ordem (e com os mesmos valores) do modo serial
+        print(f"== {len(jobs)} jobs em {args.workers} processos ==")
+        with _pool(args.workers) as pool:
+            for job, out in zip(jobs, pool.map(_run_job, jobs)):
+                print(_job_title(job))
+                yield (job, *out)
+    else:
+        for job in jobs:
+            print(_job_title(job))
+            yield (job, *_run_job(job))
+
+def _run_halving(args, alphas, gammas, f, writer, db=None):
+    #successive halving: todas as (alpha, gamma) começam com --min-episodes, cada uma com
+    #--repeats seeds; a cada rung fica só o melhor 1/eta das configs (pela média do avg_return
+    #nas seeds dela, que sobem ou caem juntas) e o orçamento multiplica por eta, até chegar em
+    #--max-episodes. Cada rung vira linhas no CSV (coluna "rung").
+    candidates = list(itertools.product(alphas, gammas))
+    seeds = [args.base_seed + rep for rep in range(args.repeats)]
+    budget = args.min_episodes
+    rung = 0
+    while True:
+        jobs = [_make_job(args, a, g, budget, seed, rung=rung) for (a, g) in candidates for seed in seeds]
+        print(f"\n== Rung {rung}: {len(candidates)} configurações x {len(seeds)} seed(s) com {budget} episódios ==")
+        returns = {}
+        for job, row, summary, ev in _iter_results(jobs, args):
+            _write_row(f, writer, job, row, db)
+            print(summary)
+            returns.setdefault((job["alpha"], job["gamma"]), []).append(ev["avg_return"])
+        scores = [sum(returns[c]) / len(returns[c]) for c in candidates]
+        if budget >= args.max_episodes or len(candidates) <= 1:
+            break
+        keep = max(1, math.ceil(len(candidates) / args.eta))
+        order = sorted(range(len(candidates)), key=lambda k: -scores[k])
+        candidates = [candidates[k] for k in sorted(order[:keep])]
+        budget = min(args.max_episodes, budget * args.eta)
+        rung += 1
+
+    best = max(range(len(candidates)), key=lambda k: scores[k])
+    a, g = candidates[best]
+    print(f"\n== Melhor: alpha={a}, gamma={g} (avg_return médio={scores[best]:.4f} em {len(seeds)} seed(s) "
+          f"com {budget} episódios) ==")
+
 def main():
     parser = argparse.ArgumentParser(description="Grid de experimentos para Blackjack Q-learning.")
     parser.add_argument("--alphas", type=str, default="0.05,0.1,0.2", help="lista de alphas, sep por vírgula")
@@ -36,10 +327,58 @@ def main():
     parser.add_argument("--repeats", type=int, default=1, help="repetições por configuração (seeds diferentes)")
     parser.add_argument("--base-seed", type=int, default=42, help="seed base; cada repetição soma +rep_idx")
     parser.add_argument("--eval-episodes", type=int, default=100_000, help="nº episódios para avaliação greedy")
+    parser.add_argument("--eval-mode", type=str, default="mc", choices=["mc", "exact", "batched", "crn"], dest="eval_mode",
+                        help="mc = Monte Carlo com --eval-episodes; exact = cálculo exato (programação dinâmica); "
+                             "batched = todas as políticas do grid avaliadas juntas numa passada vetorizada; "
+                             "crn = todas jogam o mesmo baralho fixo de --eval-episodes (cache em --deck-dir)")
+    parser.add_argument("--deck-dir", type=str, default="decks", dest="deck_dir",
+                        help="pasta de cache dos baralhos de avaliação (--eval-mode crn)")
+    parser.add_argument("--eval-ci", type=float, default=0.0, dest="eval_ci",
+                        help="se > 0, avalia em lotes até o IC 95%% do avg_return ter essa meia-largura "
+                             "(--eval-episodes vira o teto; não vale para --eval-mode batched)")
+    parser.add_argument("--eval-batch", type=int, default=10_000, dest="eval_batch",
+                        help="episódios por lote da avaliação adaptativa (--eval-ci)")
+    parser.add_argument("--dealer-mode", type=str, default="simulate", choices=DEALER_MODES, dest="dealer_mode",
+                        help="como o stick resolve o dealer no treino (simulate/sample/expected)")
+    parser.add_argument("--curve-points", type=int, default=0, dest="curve_points",
+                        help="se > 0, treino guarda só uma curva com no máx. N pontos (memória fixa)")
+    parser.add_argument("--check-every", type=int, default=0, dest="check_every",
+                        help="checa critérios de parada antecipada a cada N episódios (0 = nunca)")
+    parser.add_argument("--q-tol", type=float, default=None, dest="q_tol", help="para se max |ΔQ| entre checks < tol")
+    parser.add_argument("--policy-patience", type=int, default=0, dest="policy_patience",
+                        help="para se a política gulosa não muda em K checks seguidos")
+    parser.add_argument("--plateau-tol", type=float, default=None, dest="plateau_tol",
+                        help="para se o retorno médio da janela varia menos que tol")
+    parser.add_argument("--profile", action="store_true",
+                        help="imprime tempo por fase e contadores de treino/avaliação (só com n-envs=1)")
+    parser.add_argument("--n-envs", type=int, default=1, dest="n_envs", help="jogos em paralelo no treino/avaliação (>1 = vetorizado)")
+    parser.add_argument("--actors", type=int, default=1,
+                        help="processos por treino com a Q em memória compartilhada (cuidado ao somar com --workers)")
+    parser.add_argument("--batched-train", type=int, default=0, dest="batched_train",
+                        help="treina o grid todo numa execução vetorizada, com N jogos por configuração (0 = desliga)")
+    parser.add_argument("--search", type=str, default="grid", choices=["grid", "halving"],
+                        help="grid = produto cartesiano completo; halving = successive halving nos episódios")
+    parser.add_argument("--min-episodes", type=int, default=0, dest="min_episodes",
+                        help="orçamento inicial do halving (padrão: menor valor de --episodes)")
+    parser.add_argument("--max-episodes", type=int, default=0, dest="max_episodes",
+                        help="orçamento final do halving (padrão: maior valor de --episodes)")
+    parser.add_argument("--eta", type=int, default=3, help="halving: fica 1/eta das configs e o orçamento x eta por rung")
+    parser.add_argument("--workers", type=int, default=1, help="nº de processos para rodar o grid em paralelo")
     parser.add_argument("--out", type=str, default="experiments_results.csv", help="arquivo CSV de saída")
+    parser.add_argument("--db", type=str, default="",
+                        help="grava cada execução também num banco SQLite (ver results_db.py)")
     parser.add_argument("--append", action="store_true", help="acrescenta ao CSV se já existir (senão sobrescreve)")
-    parser.add_argument("--save-curves", action="store_true", help="salva curvas de aprendizagem por execução")
+    parser.add_argument("--resume", action="store_true",
+                        help="acrescenta ao CSV pulando (alpha, gamma, episodes, seed) que já estão nele")
+    parser.add_argument("--checkpoint-dir", type=str, default="", dest="checkpoint_dir",
+                        help="pasta para checkpoints de treino (vazio = sem checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=50_000, dest="checkpoint_every",
+                        help="episódios entre checkpoints (se --checkpoint-dir)")
+    parser.add_argument("--save-curves", action="store_true",
+                        help="salva os dados da curva (.npz) por execução; gere os PNGs com render_curves.py")
     parser.add_argument("--curves-dir", type=str, default="curves", help="pasta para curvas (se --save-curves)")
+    parser.add_argument("--save-qtables", type=str, default="", dest="save_qtables",
+                        help="pasta onde salvar a Q + política de cada execução (.npy + .json; vazio = não salva)")
 
     args = parser.parse_args()
 
@@ -47,76 +386,89 @@ def main():
     episodes_list = _parse_int_list(args.episodes)
     gammas = _parse_float_list(args.gammas)
 
+    if args.resume:
+        args.append = True
+    #combinações que o treino recusaria: checa tudo antes de abrir (e truncar) o CSV
+    if args.n_envs > 1:
+        unsupported = [name for name, on in (("--checkpoint-dir", args.checkpoint_dir), ("--profile", args.profile)) if on]
+        if unsupported:
+            parser.error(f"--n-envs > 1 não funciona com {', '.join(unsupported)}")
+    if args.actors > 1:
+        unsupported = [name for name, on in (("--n-envs", args.n_envs > 1), ("--checkpoint-dir", args.checkpoint_dir),
+                                             ("--check-every", args.check_every), ("--profile", args.profile)) if on]
+        if unsupported:
+            parser.error(f"--actors > 1 não funciona com {', '.join(unsupported)}")
+    if args.append and os.path.exists(args.out):
+        #o cabeçalho cresceu ao longo do tempo; acrescentar linhas novas num CSV antigo o corromperia
+        with open(args.out, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), None)
+        if header is not None and header != CSV_HEADER:
+            parser.error(f"{args.out} tem outras colunas ({len(header)}, esperado {len(CSV_HEADER)}); "
+                         f"use outro --out ou migre o arquivo antes de --append/--resume")
+    if args.search == "halving":
+        if args.resume:
+            parser.error("--resume não funciona com --search halving")
+        if args.eta < 2:
+            parser.error("--eta precisa ser >= 2")
+        args.min_episodes = args.min_episodes or min(episodes_list)
+        args.max_episodes = max(args.max_episodes or max(episodes_list), args.min_episodes)
+    if args.eval_ci and args.eval_mode != "mc":
+        #só a avaliação Monte Carlo (evaluate_policy) para pelo IC; nos outros modos a flag seria ignorada
+        parser.error(f"--eval-ci só funciona com --eval-mode mc (veio {args.eval_mode})")
+    if args.profile and args.eval_ci:
+        parser.error("--profile não funciona com --eval-ci")
+    args.eval_deck = ""
+    if args.eval_mode == "crn":
+        #o baralho sai uma vez aqui (ou vem do cache) e os workers só abrem o arquivo
+        cached_deck(args.eval_episodes, args.base_seed + 10_000, args.deck_dir)
+        args.eval_deck = deck_path(args.deck_dir, args.eval_episodes, args.base_seed + 10_000)
+    if args.batched_train:
+        unsupported = [name for name, on in (("--checkpoint-dir", args.checkpoint_dir), ("--check-every", args.check_every),
+                                             ("--profile", args.profile), ("--actors", args.actors > 1)) if on]
+        if unsupported:
+            parser.error(f"--batched-train não funciona com {', '.join(unsupported)}")
+
     if args.save_curves and not os.path.isdir(args.curves_dir):
         os.makedirs(args.curves_dir, exist_ok=True)
+    if args.checkpoint_dir:
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+    if args.save_qtables:
+        os.makedirs(args.save_qtables, exist_ok=True)
 
-    header = [
-        "alpha", "gamma", "episodes", "eps_start", "eps_end", "eps_decay", "seed",
-        "win_rate", "draw_rate", "loss_rate", "avg_return",
-        "wins", "losses", "draws",
-        "train_time_s", "eval_time_s", "curve_path"
-    ]
+    #lista de jobs em ordem estável: produto cartesiano das combinações x repetições
+    jobs = [_make_job(args, alpha, gamma, n_episodes, args.base_seed + rep)
+            for (alpha, gamma, n_episodes) in itertools.product(alphas, gammas, episodes_list)
+            for rep in range(args.repeats)]
 
-    write_header = True
-    if args.append and os.path.exists(args.out):
-        write_header = False
+    if args.resume:
+        done = _done_keys(args.out)
+        n_before = len(jobs)
+        jobs = [j for j in jobs if _job_key(j["alpha"], j["gamma"], j["episodes"], j["seed"]) not in done]
+        print(f"== Retomando: {n_before - len(jobs)} já no CSV, faltam {len(jobs)} ==")
+
+    #arquivo vazio (ou inexistente) ganha cabeçalho mesmo no --append
+    write_header = not (args.append and os.path.exists(args.out) and os.path.getsize(args.out) > 0)
 
     with open(args.out, "a" if args.append else "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         if write_header:
-            writer.writerow(header)
-
-        #produto cartesiano das combinações
-        for (alpha, gamma, n_episodes) in itertools.product(alphas, gammas, episodes_list):
-            for rep in range(args.repeats):
-                seed = args.base_seed + rep
-
-                print(f"== Rodando: alpha={alpha}, gamma={gamma}, episodes={n_episodes}, seed={seed} ==")
-
-                t0 = time.perf_counter()
-                Q, stats = train_q_learning(
-                    num_episodes=n_episodes,
-                    alpha=alpha,
-                    gamma=gamma,
-                    eps_start=args.eps_start,
-                    eps_end=args.eps_end,
-                    eps_decay=args.eps_decay,
-                    seed=seed,
-                )
-                t1 = time.perf_counter()
-
-                ev = evaluate_policy(Q, n_episodes=args.eval_episodes, seed=seed + 10_000)
-                t2 = time.perf_counter()
-
-                train_time = t1 - t0
-                eval_time = t2 - t1
-
-                curve_path = ""
-                if args.save_curves:
-                    curve_name = f"curve_alpha{alpha}_gamma{gamma}_eps{n_episodes}_seed{seed}.png"
-                    curve_path = os.path.join(args.curves_dir, curve_name)
-                    try:
-                        save_learning_curve(stats["episode_rewards"], path=curve_path)
-                    except Exception as e:
-                        print(f"[Aviso] Falha ao salvar curva ({e}). Prosseguindo sem curva.")
-                        curve_path = ""
-
-                row = [
-                    alpha, gamma, n_episodes, args.eps_start, args.eps_end, args.eps_decay, seed,
-                    ev["win_rate"], ev["draw_rate"], ev["loss_rate"], ev["avg_return"],
-                    stats["wins"], stats["losses"], stats["draws"],
-                    round(train_time, 4), round(eval_time, 4), curve_path
-                ]
-                writer.writerow(row)
-                #também imprime um resumo no terminal
-                print(f"  -> win={ev['win_rate']:.4f} draw={ev['draw_rate']:.4f} "
-                      f"loss={ev['loss_rate']:.4f} avg_return={ev['avg_return']:.4f} "
-                      f"| wins={stats['wins']} losses={stats['losses']} draws={stats['draws']} "
-                      f"| train_time={train_time:.2f}s eval_time={eval_time:.2f}s")
-                if curve_path:
-                    print(f"  -> curva salva em: {curve_path}")
-
-    print(f"\n[OK] Resultados salvos em: {args.out}")
+            writer.writerow(CSV_HEADER)
+
+        db = connect(args.db) if args.db else None
+        try:
+            if args.search == "halving":
+                _run_halving(args, alphas, gammas, f, writer, db)
+            else:
+                for job, row, summary, ev in _iter_results(jobs, args):
+                    _write_row(f, writer, job, row, db)
+                    print(summary)
+        finally:
+            if db is not None:
+                db.close()
+
+    print(f"\n[OK] Resultados salvos em: {args.out}" + (f" e {args.db}" if args.db else ""))
+    if args.save_curves:
+        print(f"[Dica] gráficos: python render_curves.py {args.curves_dir} --workers {max(1, args.workers)}")
     #aqui acabou, vai analisar o CSV agora
 
 if __name__ == '__main__':
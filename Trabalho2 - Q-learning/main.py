@@ -1,8 +1,9 @@
 #ponto de entrada: treino, avaliação e geração de saídas
 
 import argparse
-from qlearning import train_q_learning, evaluate_policy
-from analysis_utils import save_learning_curve, learned_policy_table, print_policy_ascii
+from env_blackjack import DEALER_MODES
+from qlearning import train_q_learning, evaluate_policy, profile_report, save_qtable
+from analysis_utils import curve_data, save_learning_curve, learned_policy_table, print_policy_ascii
 
 def main():
     parser = argparse.ArgumentParser(description="Q-learning em Blackjack (modular).")
@@ -12,6 +13,21 @@ def main():
     parser.add_argument("--eps_start", type=float, default=1.0, help="ε inicial")
     parser.add_argument("--eps_end", type=float, default=0.05, help="ε mínimo")
     parser.add_argument("--eps_decay", type=float, default=0.9995, help="decaimento de ε por episódio")
+    parser.add_argument("--dealer_mode", type=str, default="simulate", choices=DEALER_MODES,
+                        help="stick no treino: simulate (dealer compra), sample (tabela) ou expected (recompensa esperada)")
+    parser.add_argument("--curve_points", type=int, default=0,
+                        help="se > 0, estatística em streaming: curva com no máx. N pontos (memória fixa)")
+    parser.add_argument("--check_every", type=int, default=0, help="checa critérios de parada a cada N episódios (0 = nunca)")
+    parser.add_argument("--q_tol", type=float, default=None, help="para se max |ΔQ| entre checks < q_tol")
+    parser.add_argument("--policy_patience", type=int, default=0, help="para se a política não muda em K checks seguidos")
+    parser.add_argument("--plateau_tol", type=float, default=None, help="para se o retorno médio da janela varia < tol")
+    parser.add_argument("--n_envs", type=int, default=1, help="jogos em paralelo (>1 usa o VecBlackjackEnv)")
+    parser.add_argument("--actors", type=int, default=1,
+                        help="processos treinando a mesma Q em memória compartilhada (>1 = Hogwild, não determinístico)")
+    parser.add_argument("--profile", action="store_true", help="mostra tempo por fase e contadores (só com n_envs=1)")
+    parser.add_argument("--eval_ci", type=float, default=None,
+                        help="avalia em lotes até o IC 95%% do avg_return ter essa meia-largura (teto: 100000 episódios)")
+    parser.add_argument("--save_q", type=str, default="", help="salva Q + política em <caminho>.npy/.json")
     args = parser.parse_args()
 
     print("Treinando...")
@@ -23,16 +39,39 @@ def main():
         eps_end=args.eps_end,
         eps_decay=args.eps_decay,
         seed=42,
+        n_envs=args.n_envs,
+        dealer_mode=args.dealer_mode,
+        curve_points=args.curve_points,
+        check_every=args.check_every,
+        q_tol=args.q_tol,
+        policy_patience=args.policy_patience,
+        plateau_tol=args.plateau_tol,
+        profile=args.profile,
+        n_actors=args.actors,
     )
-    print(f"Treino concluído com {args.episodes} episódios.")
+    print(f"Treino concluído com {stats['stopped_episode']} episódios (parada: {stats['stop_reason']}).")
     print(f"Wins: {stats['wins']} | Losses: {stats['losses']} | Draws: {stats['draws']}")
+    if args.profile:
+        print(profile_report(stats["profile"]))
 
     print("Avaliando política (greedy)...")
-    ev = evaluate_policy(Q, n_episodes=100_000, seed=7)
+    ev = evaluate_policy(Q, n_episodes=100_000, seed=7, n_envs=args.n_envs, profile=args.profile,
+                         ci_halfwidth=args.eval_ci)
+    ev_profile = ev.pop("profile", None)
     for k, v in ev.items():
-        print(f"{k}: {v:.4f}")
+        #episodes é contagem (int); o resto são taxas/médias
+        print(f"{k}: {v}" if isinstance(v, int) else f"{k}: {v:.4f}")
+    if ev_profile:
+        print(profile_report(ev_profile))
 
-    save_learning_curve(stats["episode_rewards"], "learning_curve.png")
+    rewards, block = curve_data(stats)
+    save_learning_curve(rewards, "learning_curve.png", block=block)
+
+    if args.save_q:
+        meta = {k: getattr(args, k) for k in ("episodes", "alpha", "gamma", "eps_start", "eps_end", "eps_decay",
+                                              "n_envs", "dealer_mode")}
+        meta.update(seed=42, stopped_episode=stats["stopped_episode"], stop_reason=stats["stop_reason"])
+        print(f"[OK] Q-table salva em: {save_qtable(args.save_q, Q, meta)}")
 
     no_ace = learned_policy_table(Q, usable_ace=False)
     yes_ace = learned_policy_table(Q, usable_ace=True)
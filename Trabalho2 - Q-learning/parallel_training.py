@@ -0,0 +1,127 @@
+#Q-learning em vários processos (estilo Hogwild): a Q-table fica num bloco de
+#multiprocessing.shared_memory e cada ator (um processo) joga no seu próprio
+#ambiente e escreve direto nela, sem lock. Atualizações simultâneas no mesmo (s, a)
+#podem se sobrescrever de vez em quando; com 640 estados e passos curtos isso quase
+#não acontece e o ganho de tempo é ~linear no nº de núcleos.
+
+#uso normal é pelo train_q_learning(..., n_actors=N) ou main.py --actors N.
+#o resultado NÃO é determinístico (depende de como os processos se intercalam).
+
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+from env_blackjack import FastBlackjackEnv, N_STATES
+from qlearning import QTable, StreamingCurve, train_episode
+
+def _split(n: int, k: int) -> List[int]:
+    #divide n episódios em k partes quase iguais
+    return [n // k + (1 if i < n % k else 0) for i in range(k)]
+
+def _actor(shm_name: str, n_episodes: int, alpha: float, gamma: float, eps_start: float, eps_end: float,
+           eps_decay: float, seed: int, dealer_mode: str, curve_points: int) -> dict:
+    #roda num processo filho: mesmo episódio do train_q_learning escalar (train_episode), mas com a Q compartilhada
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        q = np.ndarray((N_STATES, 2), dtype=np.float32, buffer=shm.buf)
+        env = FastBlackjackEnv(dealer_mode=dealer_mode, seed=seed)
+        agent_rng = random.Random(seed)
+        explore = agent_rng.random
+        pick = agent_rng.choice
+
+        curve = StreamingCurve(curve_points) if curve_points > 0 else None
+        episode_rewards = []
+        record = curve.add if curve is not None else episode_rewards.append
+        epsilon = eps_start
+        wins = losses = draws = 0
+        t0 = time.perf_counter()
+
+        for ep in range(n_episodes):
+            #Hogwild: o episódio lê, calcula e escreve na Q compartilhada sem trava
+            G = train_episode(env, q, epsilon, alpha, gamma, explore, pick)
+            record(G)
+            if G > 0: wins += 1
+            elif G < 0: losses += 1
+            else: draws += 1
+            epsilon = max(eps_end, epsilon * eps_decay)
+
+        del q  #solta a view antes de fechar o bloco
+        return {
+            "episodes": n_episodes, "wins": wins, "losses": losses, "draws": draws,
+            "seconds": time.perf_counter() - t0,
+            "episode_rewards": np.asarray(episode_rewards, dtype=np.float32) if curve is None else None,
+            "curve": curve,
+        }
+    finally:
+        shm.close()
+
+def _merge_curves(results: List[dict], n_actors: int) -> dict:
+    #sem curve_points: intercala os retornos dos atores (episódio k de cada ator ~ mesma época
+    #do treino), dando um vetor com todos os episódios. Com curve_points: média das curvas
+    #dos atores ponto a ponto; cada ponto cobre block episódios de cada ator
+    if results[0]["curve"] is None:
+        parts = [r["episode_rewards"] for r in results]
+        out = np.zeros(sum(len(p) for p in parts), dtype=np.float32)
+        m = min(len(p) for p in parts)
+        out[:m * n_actors] = np.stack([p[:m] for p in parts], axis=1).ravel()
+        out[m * n_actors:] = np.concatenate([p[m:] for p in parts])
+        return {"episode_rewards": out}
+    curves = [r["curve"] for r in results]
+    block = max(c.block for c in curves)
+    #atores com menos episódios podem ter bloco menor; reagrupa pro maior bloco
+    arrays = []
+    for c in curves:
+        a = c.as_array()
+        f = block // c.block
+        if f > 1:
+            a = a[:len(a) // f * f].reshape(-1, f).mean(axis=1)
+        arrays.append(a)
+    m = min(len(a) for a in arrays)
+    return {"learning_curve": np.mean([a[:m] for a in arrays], axis=0).astype(np.float32),
+            "curve_block": block * n_actors}
+
+def train_q_learning_parallel(num_episodes: int = 200_000, alpha: float = 0.1, gamma: float = 1.0,
+                              eps_start: float = 1.0, eps_end: float = 0.05, eps_decay: float = 0.9995,
+                              seed: int = 42, n_actors: int = 2, dealer_mode: str = "simulate",
+                              curve_points: int = 0, max_workers: Optional[int] = None):
+    #divide num_episodes entre n_actors processos que treinam a mesma Q compartilhada.
+    #cada ator tem ambiente, RNG e ε próprios (seeds filhas de SeedSequence(seed)); o ε de cada
+    #um decai eps_decay**n_actors por episódio, então no total a exploração segue o mesmo
+    #cronograma por episódio global do treino serial.
+    #devolve (Q, stats) no mesmo formato do train_q_learning, com "actors" (episódios e tempo de cada)
+    n_actors = max(1, min(n_actors, num_episodes))
+    seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(n_actors)]
+    budgets = _split(num_episodes, n_actors)
+
+    shm = shared_memory.SharedMemory(create=True, size=N_STATES * 2 * np.dtype(np.float32).itemsize)
+    try:
+        q = np.ndarray((N_STATES, 2), dtype=np.float32, buffer=shm.buf)
+        q[:] = 0.0
+        with ProcessPoolExecutor(max_workers=max_workers or n_actors) as pool:
+            futures = [pool.submit(_actor, shm.name, budgets[k], alpha, gamma, eps_start, eps_end,
+                                   eps_decay ** n_actors, seeds[k], dealer_mode, curve_points)
+                       for k in range(n_actors)]
+            results = [f.result() for f in futures]
+        Q = QTable(q.copy())
+        del q
+    finally:
+        shm.close()
+        shm.unlink()
+
+    stats = {
+        "wins": sum(r["wins"] for r in results),
+        "losses": sum(r["losses"] for r in results),
+        "draws": sum(r["draws"] for r in results),
+        **_merge_curves(results, n_actors),
+        "stopped_episode": sum(r["episodes"] for r in results),
+        "stop_reason": "max_episodes",
+        "actors": [{"episodes": r["episodes"], "seconds": round(r["seconds"], 4)} for r in results],
+        "Q": Q,
+    }
+    return Q, stats
@@ -0,0 +1,365 @@
+#servidor local (asyncio) que responde ações das políticas treinadas
+#carrega uma ou mais Q-tables salvas (save_qtable / --save-qtables) e atende por TCP ou socket Unix.
+#pedidos que chegam juntos são agrupados numa única consulta vetorizada à política densa.
+
+#como usar:
+#   python policy_server.py serve qtables/*.npy --port 8765
+#   python policy_server.py serve run.npy --unix /tmp/blackjack.sock
+#   python policy_server.py bench --port 8765 --clients 32 --requests 2000
+
+#protocolo: uma linha JSON por pedido, uma linha JSON por resposta (mesmo "id")
+#   {"id": 1, "op": "act", "state": [15, 10, 0]}                  -> {"id": 1, "action": 1}
+#   {"id": 2, "op": "act_batch", "states": [[12, 2, 0], ...]}     -> {"id": 2, "actions": [1, ...]}
+#   {"id": 3, "op": "policies"}                                   -> {"id": 3, "policies": ["run", ...]}
+#   {"id": 4, "op": "metrics"}                                    -> {"id": 4, "metrics": {...}}
+#"policy" (nome do arquivo sem .npy) escolhe a política; sem ele vale a primeira carregada.
+#erro: {"id": ..., "error": "mensagem"}
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from env_blackjack import PLAYER_SUM_MAX, state_indices
+from qlearning import greedy_policy, load_qtable
+
+def load_policies(paths: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    #(nomes, policies[k, N_STATES]) a partir dos arquivos do save_qtable
+    names, policies = [], []
+    for path in paths:
+        Q, _ = load_qtable(path)
+        names.append(os.path.basename(path)[:-4] if path.endswith(".npy") else os.path.basename(path))
+        policies.append(greedy_policy(Q))
+    return names, np.stack(policies)
+
+def _parse_states(states) -> np.ndarray:
+    #lista de [player_sum, dealer_up, usable_ace] -> índices densos (valida os limites)
+    obs = np.asarray(states, dtype=np.int64).reshape(-1, 3)
+    ok = ((obs[:, 0] >= 0) & (obs[:, 0] <= PLAYER_SUM_MAX) & (obs[:, 1] >= 1) & (obs[:, 1] <= 10)
+          & ((obs[:, 2] == 0) | (obs[:, 2] == 1)))
+    if not ok.all():
+        bad = obs[np.flatnonzero(~ok)[0]].tolist()
+        raise ValueError(f"estado inválido: {bad} (esperado [0..{PLAYER_SUM_MAX}, 1..10, 0/1])")
+    return state_indices(obs)
+
+class ServerMetrics:
+    #contadores + latências recentes (janela fixa, pra não crescer sem limite)
+    def __init__(self, window: int = 10_000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.states = 0
+        self.batches = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def as_dict(self) -> Dict[str, float]:
+        uptime = time.perf_counter() - self.started
+        lat = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        return {
+            "uptime_s": round(uptime, 3),
+            "requests": self.requests,
+            "states": self.states,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_states": round(self.states / max(1, self.batches), 2),
+            "requests_per_s": round(self.requests / uptime, 1),
+            "states_per_s": round(self.states / uptime, 1),
+            "latency_ms_p50": round(float(np.percentile(lat, 50)), 4),
+            "latency_ms_p95": round(float(np.percentile(lat, 95)), 4),
+            "latency_ms_p99": round(float(np.percentile(lat, 99)), 4),
+            "latency_ms_max": round(float(lat.max()), 4),
+        }
+
+class MicroBatcher:
+    """
+    Junta os pedidos que chegam enquanto um lote está aberto (até max_batch estados
+    ou max_delay segundos depois do primeiro) e resolve todos com uma indexação só:
+    policies[dono, estado]. Cada pedido recebe um future com suas ações.
+    """
+    def __init__(self, policies: np.ndarray, metrics: ServerMetrics, max_batch: int = 4096,
+                 max_delay: float = 0.0005):
+        self.policies = policies
+        self.metrics = metrics
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, policy: int, idx: np.ndarray) -> np.ndarray:
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((policy, idx, fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            n = len(batch[0][1])
+            deadline = loop.time() + self.max_delay
+            while n < self.max_batch:
+                #pega o que já está na fila; se não tem nada, espera até o prazo
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self.queue.get_nowait()
+                batch.append(item)
+                n += len(item[1])
+            self._resolve(batch)
+
+    def _resolve(self, batch):
+        owners = np.concatenate([np.full(len(idx), p, dtype=np.int64) for p, idx, _ in batch])
+        idx = np.concatenate([idx for _, idx, _ in batch])
+        actions = self.policies[owners, idx]
+        self.metrics.batches += 1
+        start = 0
+        for _, i, fut in batch:
+            if not fut.done():
+                fut.set_result(actions[start:start + len(i)])
+            start += len(i)
+
+class PolicyServer:
+    def __init__(self, names: List[str], policies: np.ndarray, max_batch: int = 4096,
+                 max_delay: float = 0.0005):
+        self.names = names
+        self.index = {name: k for k, name in enumerate(names)}
+        self.metrics = ServerMetrics()
+        self.batcher = MicroBatcher(policies, self.metrics, max_batch, max_delay)
+
+    async def handle(self, msg: dict) -> dict:
+        op = msg.get("op")
+        out = {"id": msg.get("id")}
+        if op == "policies":
+            out["policies"] = self.names
+            return out
+        if op == "metrics":
+            out["metrics"] = self.metrics.as_dict()
+            return out
+        if op not in ("act", "act_batch"):
+            raise ValueError(f"op desconhecida: {op!r}")
+        name = msg.get("policy", self.names[0])
+        if name not in self.index:
+            raise ValueError(f"política desconhecida: {name!r}")
+        field = "state" if op == "act" else "states"
+        if field not in msg:
+            raise ValueError(f"pedido {op!r} sem o campo {field!r}")
+        t0 = time.perf_counter()
+        idx = _parse_states(msg[field])
+        actions = await self.batcher.submit(self.index[name], idx)
+        self.metrics.latencies.append(time.perf_counter() - t0)
+        self.metrics.requests += 1
+        self.metrics.states += len(idx)
+        if op == "act":
+            out["action"] = int(actions[0])
+        else:
+            out["actions"] = actions.tolist()
+        return out
+
+    async def _respond(self, msg: dict, writer: asyncio.StreamWriter):
+        #sempre responde: qualquer erro vira {"error": ...}, senão o cliente fica esperando
+        try:
+            out = await self.handle(msg)
+        except Exception as e:
+            self.metrics.errors += 1
+            out = {"id": msg.get("id") if isinstance(msg, dict) else None, "error": str(e) or type(e).__name__}
+        writer.write((json.dumps(out) + "\n").encode())
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        #cada linha vira uma task, então pedidos em sequência (pipeline) do mesmo
+        #cliente também caem no mesmo lote; as respostas podem sair fora de ordem (use o id)
+        pending = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError as e:
+                    self.metrics.errors += 1
+                    writer.write((json.dumps({"id": None, "error": f"JSON inválido: {e}"}) + "\n").encode())
+                    continue
+                if not isinstance(msg, dict):
+                    self.metrics.errors += 1
+                    writer.write((json.dumps({"id": None, "error": "pedido precisa ser um objeto JSON"}) + "\n").encode())
+                    continue
+                task = asyncio.ensure_future(self._respond(msg, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                if writer.transport.get_write_buffer_size() > 1 << 20:
+                    await writer.drain()
+            if pending:
+                await asyncio.gather(*pending)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix: str = "") -> asyncio.AbstractServer:
+        #liga o batcher e abre o socket (port=0 escolhe uma porta livre); quem chama fecha o servidor
+        self.batcher.start()
+        if unix:
+            return await asyncio.start_unix_server(self._client, path=unix)
+        return await asyncio.start_server(self._client, host, port)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix: str = ""):
+        server = await self.start(host, port, unix)
+        where = unix or f"{host}:{server.sockets[0].getsockname()[1]}"
+        print(f"[OK] Servindo {len(self.names)} política(s) em {where}: {', '.join(self.names)}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+class PolicyClient:
+    """
+    Cliente asyncio: manda pedidos em pipeline e casa as respostas pelo id.
+        client = await PolicyClient.connect(port=8765)
+        a = await client.act((15, 10, 0))
+        acts = await client.act_batch([(12, 2, 0), (20, 5, 1)])
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._reader_task = asyncio.get_running_loop().create_task(self._read())
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 8765, unix: str = "") -> "PolicyClient":
+        if unix:
+            reader, writer = await asyncio.open_unix_connection(unix)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _read(self):
+        while line := await self.reader.readline():
+            msg = json.loads(line)
+            fut = self._waiting.pop(msg.get("id"), None)
+            if fut is not None and not fut.done():
+                fut.set_result(msg)
+        for fut in self._waiting.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("conexão fechada pelo servidor"))
+
+    async def request(self, op: str, **fields) -> dict:
+        self._next_id += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._waiting[self._next_id] = fut
+        self.writer.write((json.dumps({"id": self._next_id, "op": op, **fields}) + "\n").encode())
+        await self.writer.drain()
+        msg = await fut
+        if "error" in msg:
+            raise ValueError(msg["error"])
+        return msg
+
+    async def act(self, state, policy: Optional[str] = None) -> int:
+        extra = {"policy": policy} if policy else {}
+        return (await self.request("act", state=list(map(int, state)), **extra))["action"]
+
+    async def act_batch(self, states, policy: Optional[str] = None) -> List[int]:
+        extra = {"policy": policy} if policy else {}
+        states = np.asarray(states, dtype=np.int64).reshape(-1, 3).tolist()
+        return (await self.request("act_batch", states=states, **extra))["actions"]
+
+    async def policies(self) -> List[str]:
+        return (await self.request("policies"))["policies"]
+
+    async def metrics(self) -> Dict[str, float]:
+        return (await self.request("metrics"))["metrics"]
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._reader_task.cancel()
+
+async def run_bench(host: str, port: int, unix: str, clients: int, requests: int, batch: int, seed: int = 0):
+    #`clients` conexões mandando `requests` pedidos cada (act ou act_batch com `batch` estados)
+    #ao mesmo tempo; mede o lado do cliente e imprime as métricas do servidor
+    rng = np.random.default_rng(seed)
+    conns = [await PolicyClient.connect(host, port, unix) for _ in range(clients)]
+    states = np.stack([rng.integers(4, 22, size=(requests, max(1, batch))),
+                       rng.integers(1, 11, size=(requests, max(1, batch))),
+                       rng.integers(0, 2, size=(requests, max(1, batch)))], axis=-1)
+
+    async def worker(client):
+        lat = []
+        for r in range(requests):
+            t0 = time.perf_counter()
+            if batch > 0:
+                await client.act_batch(states[r])
+            else:
+                await client.act(states[r, 0])
+            lat.append(time.perf_counter() - t0)
+        return lat
+
+    t0 = time.perf_counter()
+    lats = await asyncio.gather(*(worker(c) for c in conns))
+    elapsed = time.perf_counter() - t0
+    lat = np.concatenate(lats) * 1e3
+    n_states = clients * requests * max(1, batch)
+    print(f"{clients * requests} pedidos ({n_states} estados) em {elapsed:.3f}s: "
+          f"{clients * requests / elapsed:,.0f} pedidos/s, {n_states / elapsed:,.0f} estados/s")
+    print(f"latência no cliente (ms): p50={np.percentile(lat, 50):.3f} p95={np.percentile(lat, 95):.3f} "
+          f"p99={np.percentile(lat, 99):.3f}")
+    print("servidor:", json.dumps(await conns[0].metrics(), indent=1))
+    for c in conns:
+        await c.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de políticas do Blackjack (JSON por linha, micro-batching).")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("serve", "bench"):
+        p = sub.add_parser(name)
+        p.add_argument("--host", type=str, default="127.0.0.1")
+        p.add_argument("--port", type=int, default=8765)
+        p.add_argument("--unix", type=str, default="", help="caminho de socket Unix (em vez de TCP)")
+    serve = sub.choices["serve"]
+    serve.add_argument("qtables", nargs="+", help="arquivos .npy salvos pelo save_qtable")
+    serve.add_argument("--max-batch", type=int, default=4096, dest="max_batch", help="máx. de estados por lote")
+    serve.add_argument("--max-delay-ms", type=float, default=0.5, dest="max_delay_ms",
+                       help="quanto um lote espera por mais pedidos depois do primeiro")
+    bench = sub.choices["bench"]
+    bench.add_argument("--clients", type=int, default=16, help="conexões simultâneas")
+    bench.add_argument("--requests", type=int, default=1000, help="pedidos por conexão")
+    bench.add_argument("--batch", type=int, default=0, help="estados por pedido (0 = act de um estado)")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        names, policies = load_policies(args.qtables)
+        server = PolicyServer(names, policies, args.max_batch, args.max_delay_ms / 1000)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            print("\n" + json.dumps(server.metrics.as_dict(), indent=1))
+    else:
+        asyncio.run(run_bench(args.host, args.port, args.unix, args.clients, args.requests, args.batch))
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,284 @@
 # Q-learning tabular e avaliação para o Blackjack
 
-from collections import defaultdict
-from typing import Dict, Tuple
+from typing import Iterator, Mapping, Optional, Tuple
+import json
+import math
+import os
+import pickle
 import random
+import time
 import numpy as np
 
-from env_blackjack import BlackjackEnv
+from env_blackjack import (
+    FastBlackjackEnv, GroupedStream, VecBlackjackEnv, N_STATES, sample_uniform, state_index, state_indices,
+    CARD_PROBS, dealer_outcome_table,
+)
 
 State = Tuple[int, int, int]  #(player_sum, dealer_upcard, usable_ace)
 
-def epsilon_greedy(Q: Dict[State, np.ndarray], state: State, epsilon: float) -> int:
+class QTable:
+    """
+    Q-table densa: um único array contíguo values[N_STATES, 2] (float32),
+    indexado por state_index(player_sum, dealer_upcard, usable_ace).
+    Acesso tipo dict: Q[s] devolve a linha (view), então Q[s][a] += ... funciona.
+    Ler um estado nunca insere nada; "presente" = linha com algum valor != 0.
+    """
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        if values is None:
+            values = np.zeros((N_STATES, 2), dtype=np.float32)
+        self.values = np.asarray(values, dtype=np.float32)
+
+    @classmethod
+    def from_dict(cls, Q: Mapping[State, np.ndarray]) -> "QTable":
+        #converte uma Q antiga (dict/defaultdict) para o formato denso
+        table = cls()
+        for s, q in Q.items():
+            table.values[state_index(s)] = q
+        return table
+
+    def copy(self) -> "QTable":
+        return QTable(self.values.copy())
+
+    def __getitem__(self, state: State) -> np.ndarray:
+        return self.values[state_index(state)]
+
+    def __setitem__(self, state: State, q) -> None:
+        self.values[state_index(state)] = q
+
+    def _present(self) -> np.ndarray:
+        return np.flatnonzero(self.values.any(axis=1))
+
+    def __contains__(self, state) -> bool:
+        i = state_index(state)
+        return 0 <= i < N_STATES and bool(self.values[i].any())
+
+    def __len__(self) -> int:
+        return len(self._present())
+
+    def __iter__(self) -> Iterator[State]:
+        return iter(self.keys())
+
+    def get(self, state: State, default=None):
+        return self[state] if state in self else default
+
+    def keys(self):
+        out = []
+        for i in self._present():
+            p_sum, rest = divmod(int(i), 20)
+            d_up, ace = divmod(rest, 2)
+            out.append((p_sum, d_up + 1, ace))
+        return out
+
+    def items(self):
+        return [(s, self[s]) for s in self.keys()]
+
+class StreamingCurve:
+    """
+    Curva de aprendizagem com memória fixa: guarda a média do retorno por bloco
+    de `block` episódios. Quando chega em max_points, junta os blocos dois a dois
+    e dobra o tamanho do bloco, então o custo não depende do nº de episódios.
+    """
+    __slots__ = ("max_points", "block", "means", "_acc", "_n")
+
+    def __init__(self, max_points: int = 1000):
+        self.max_points = max(2, max_points - max_points % 2)
+        self.block = 1
+        self.means = []
+        self._acc = 0.0
+        self._n = 0
+
+    def add(self, g: float) -> None:
+        self._acc += g
+        self._n += 1
+        if self._n == self.block:
+            self.means.append(self._acc / self.block)
+            self._acc = 0.0
+            self._n = 0
+            if len(self.means) >= self.max_points:
+                m = self.means
+                self.means = [(m[k] + m[k + 1]) / 2 for k in range(0, len(m), 2)]
+                self.block *= 2
+
+    def extend(self, rewards) -> None:
+        for g in rewards:
+            self.add(float(g))
+
+    def as_array(self) -> np.ndarray:
+        #só blocos completos (o resto parcial fica de fora)
+        return np.array(self.means, dtype=np.float32)
+
+def _reward_stats(episode_rewards, curve: Optional[StreamingCurve]) -> dict:
+    #sem curve: retornos de todos os episódios (como antes); com curve: médias por bloco
+    if curve is None:
+        return {"episode_rewards": np.asarray(episode_rewards, dtype=np.float32)}
+    return {"learning_curve": curve.as_array(), "curve_block": curve.block}
+
+#células da tabela de política (mesma ordem do learned_policy_table, sem Ás e com Ás)
+_POLICY_CELLS = np.array([state_index((p_sum, d_up, ace))
+                          for ace in (0, 1) for p_sum in range(12, 22) for d_up in range(1, 11)])
+
+class _EarlyStopping:
+    """
+    Critérios de parada checados a cada check_every episódios:
+      q_tol           -> maior |ΔQ| desde o último check abaixo da tolerância
+      policy_patience -> tabela da política gulosa igual em K checks seguidos
+      plateau_tol     -> retorno médio da janela quase igual ao da janela anterior
+    check() devolve o motivo da parada (str) ou None.
+    """
+    def __init__(self, q_tol: Optional[float] = None, policy_patience: int = 0,
+                 plateau_tol: Optional[float] = None):
+        self.q_tol = q_tol
+        self.policy_patience = policy_patience
+        self.plateau_tol = plateau_tol
+        self.prev_q = None
+        self.prev_policy = None
+        self.same_policy = 0
+        self.prev_mean = None
+
+    def check(self, q: np.ndarray, window_mean: float) -> Optional[str]:
+        reason = None
+        if self.q_tol is not None and self.prev_q is not None:
+            if float(np.max(np.abs(q - self.prev_q))) < self.q_tol:
+                reason = "q_tol"
+        policy = q[_POLICY_CELLS, 1] > q[_POLICY_CELLS, 0]
+        if self.prev_policy is not None and np.array_equal(policy, self.prev_policy):
+            self.same_policy += 1
+        else:
+            self.same_policy = 0
+        if reason is None and self.policy_patience and self.same_policy >= self.policy_patience:
+            reason = "policy_stable"
+        if reason is None and self.plateau_tol is not None and self.prev_mean is not None:
+            if abs(window_mean - self.prev_mean) < self.plateau_tol:
+                reason = "plateau"
+        self.prev_q = q.copy()
+        self.prev_policy = policy
+        self.prev_mean = window_mean
+        return reason
+
+class PhaseProfiler:
+    """
+    Instrumentação opcional do treino/avaliação (profile=True).
+    times: segundos por fase (env_step, action, update, bookkeeping)
+    counts: episodes, env_steps, dealer_draws, q_lookups (leituras de linha da Q),
+            new_states (estados atualizados pela primeira vez)
+    """
+    PHASES = ("env_step", "action", "update", "bookkeeping")
+    COUNTERS = ("episodes", "env_steps", "dealer_draws", "q_lookups", "new_states")
+
+    def __init__(self):
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.seen = [False] * N_STATES  #estados já atualizados
+
+    def as_dict(self) -> dict:
+        return {"times_s": dict(self.times), "counts": dict(self.counts)}
+
+def profile_report(profile: dict) -> str:
+    #texto curto pro terminal a partir de stats["profile"] / ev["profile"]
+    times, counts = profile["times_s"], profile["counts"]
+    total = sum(times.values()) or 1.0
+    lines = ["  perfil por fase:"]
+    for name, t in times.items():
+        if t:
+            lines.append(f"    {name:<12} {t:8.3f}s ({100 * t / total:5.1f}%)")
+    lines.append("    " + " | ".join(f"{k}={v}" for k, v in counts.items() if v))
+    return "\n".join(lines)
+
+def train_episode(env, q: np.ndarray, epsilon: float, alpha: float, gamma: float, explore, pick) -> float:
+    #um episódio de Q-learning escalar direto no array q (N_STATES, 2); devolve o retorno G.
+    #explore/pick: random()/choice() do RNG do agente (mesma sequência de sorteios do epsilon_greedy).
+    #usado pelo train_q_learning e pelos atores do parallel_training (lá q é a memória compartilhada)
+    s = env.reset()
+    i = state_index(s)
+    done = False
+    G = 0.0
+
+    while not done:
+        #ε-gulosa
+        if explore() < epsilon:
+            a = pick([0, 1])
+        else:
+            a = 1 if q[i, 1] > q[i, 0] else 0
+        s2, r, done = env.step(a)
+
+        #atualização TD(0)
+        if done:
+            target = r
+        else:
+            i2 = state_index(s2)
+            target = r + gamma * max(q[i2, 0], q[i2, 1])
+        q[i, a] += alpha * (target - q[i, a])
+
+        if not done:
+            i = i2
+        G += r
+    return G
+
+def _train_episode_profiled(env, q, epsilon, alpha, gamma, explore, pick, prof) -> float:
+    #o mesmo episódio do train_episode, cronometrando cada fase.
+    #dealer_draws sai da diferença de cartas consumidas durante o stick
+    times, counts = prof.times, prof.counts
+    clock = time.perf_counter
+    cards = env.cards
+    seen = prof.seen
+
+    t0 = clock()
+    s = env.reset()
+    times["env_step"] += clock() - t0
+    i = state_index(s)
+    done = False
+    G = 0.0
+    steps = lookups = new = 0
+
+    while not done:
+        t0 = clock()
+        if explore() < epsilon:
+            a = pick([0, 1])
+        else:
+            a = 1 if q[i, 1] > q[i, 0] else 0
+            lookups += 1
+        t1 = clock()
+        drawn = cards.drawn
+        s2, r, done = env.step(a)
+        t2 = clock()
+        if a == 0:
+            counts["dealer_draws"] += cards.drawn - drawn
+
+        if done:
+            target = r
+        else:
+            i2 = state_index(s2)
+            target = r + gamma * max(q[i2, 0], q[i2, 1])
+            lookups += 1
+        if not seen[i]:
+            seen[i] = True
+            new += 1
+        q[i, a] += alpha * (target - q[i, a])
+        lookups += 1
+        t3 = clock()
+
+        times["action"] += t1 - t0
+        times["env_step"] += t2 - t1
+        times["update"] += t3 - t2
+        steps += 1
+        if not done:
+            i = i2
+        G += r
+
+    counts["episodes"] += 1
+    counts["env_steps"] += steps
+    counts["q_lookups"] += lookups
+    counts["new_states"] += new
+    return G
+
+def epsilon_greedy(Q: Mapping[State, np.ndarray], state: State, epsilon: float, rng=random) -> int:
     #escolhe ação 0/1 com política ε-gulosa.
     #se der sorte, escolhe aleatório, senão vai no melhor (ou não)
-    if random.random() < epsilon:
-        return random.choice([0, 1])
+    #rng: qualquer coisa com random()/choice() (random.Random do agente; padrão = módulo random)
+    if rng.random() < epsilon:
+        return rng.choice([0, 1])
     return int(np.argmax(Q[state]))
 
 def train_q_learning(
@@ -23,35 +288,96 @@ def train_q_learning(
     eps_start: float = 1.0,
     eps_end: float = 0.05,
     eps_decay: float = 0.9995,
-    seed: int = 42
+    seed: int = 42,
+    n_envs: int = 1,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = 0,
+    dealer_mode: str = "simulate",
+    curve_points: int = 0,
+    check_every: int = 0,
+    q_tol: Optional[float] = None,
+    policy_patience: int = 0,
+    plateau_tol: Optional[float] = None,
+    profile: bool = False,
+    n_actors: int = 1
 ):
-    random.seed(seed)
-    np.random.seed(seed)
+    #checkpoint_path + checkpoint_every: a cada N episódios salva Q, ε, contagens e
+    #estado dos RNGs (agente + cartas do ambiente); se o arquivo já existir (mesma config), continua dali.
+    #curve_points > 0: estatística em streaming; em vez de guardar o retorno de cada
+    #episódio, stats traz "learning_curve" (médias por bloco, no máx. curve_points) e "curve_block".
+    #check_every > 0: parada antecipada (q_tol / policy_patience / plateau_tol, ver _EarlyStopping);
+    #stats traz "stopped_episode" (episódios rodados) e "stop_reason" ("max_episodes" se rodou tudo).
+    #profile=True: cronômetros por fase + contadores em stats["profile"] (ver PhaseProfiler).
+    #n_actors > 1: n_actors processos treinando a mesma Q em memória compartilhada
+    #(parallel_training.py, estilo Hogwild; não determinístico).
+    if n_actors > 1:
+        if n_envs > 1 or checkpoint_path or check_every > 0 or profile:
+            raise ValueError("n_actors > 1 não combina com n_envs, checkpoint, parada antecipada ou profile")
+        from parallel_training import train_q_learning_parallel  #só carrega multiprocessing se usar
+        return train_q_learning_parallel(num_episodes, alpha, gamma, eps_start, eps_end, eps_decay, seed,
+                                         n_actors, dealer_mode, curve_points)
+    stopper = _EarlyStopping(q_tol, policy_patience, plateau_tol) if check_every > 0 else None
+    prof = PhaseProfiler() if profile else None
+    if n_envs > 1:
+        if checkpoint_path:
+            raise ValueError("checkpoint só é suportado no modo escalar (n_envs=1)")
+        if profile:
+            raise ValueError("profile só é suportado no modo escalar (n_envs=1)")
+        return _train_q_learning_vec(num_episodes, alpha, gamma, eps_start, eps_end, eps_decay, seed, n_envs,
+                                     dealer_mode, curve_points, check_every, stopper)
 
-    env = BlackjackEnv()
-    Q: Dict[State, np.ndarray] = defaultdict(lambda: np.zeros(2, dtype=np.float32))
+    #RNGs próprios: cartas no Generator do ambiente, exploração num random.Random
+    #do agente; o estado global de random/np.random não é tocado
+    #FastBlackjackEnv: mesmos episódios do BlackjackEnv pra mesma seed, só que mais rápido
+    env = FastBlackjackEnv(dealer_mode=dealer_mode, seed=seed)
+    agent_rng = random.Random(seed)
+    Q = QTable()
 
     episode_rewards = []
+    curve = StreamingCurve(curve_points) if curve_points > 0 else None
     epsilon = eps_start
     wins = losses = draws = 0
+    start_ep = 0
+    window_sum = 0.0
+    stop_reason = "max_episodes"
+    stopped_episode = num_episodes
 
-    for ep in range(num_episodes):
-        s = env.reset()
-        done = False
-        G = 0.0
+    config = {
+        "num_episodes": num_episodes, "alpha": alpha, "gamma": gamma,
+        "eps_start": eps_start, "eps_end": eps_end, "eps_decay": eps_decay, "seed": seed,
+        "dealer_mode": dealer_mode, "curve_points": curve_points,
+        "check_every": check_every, "q_tol": q_tol, "policy_patience": policy_patience,
+        "plateau_tol": plateau_tol,
+    }
+    if checkpoint_path:
+        ckpt = load_checkpoint(checkpoint_path, config)
+        if ckpt is not None:
+            Q = QTable(ckpt["Q"])
+            episode_rewards = list(ckpt["episode_rewards"])
+            curve = ckpt["curve"]
+            stopper = ckpt["stopper"]
+            window_sum = ckpt["window_sum"]
+            epsilon = ckpt["epsilon"]
+            wins, losses, draws = ckpt["wins"], ckpt["losses"], ckpt["draws"]
+            start_ep = ckpt["episode"]
+            agent_rng.setstate(ckpt["agent_rng_state"])
+            env.set_cards(ckpt["cards"])
+            print(f"[OK] Retomando do checkpoint {checkpoint_path} (episódio {start_ep})")
 
-        while not done:
-            a = epsilon_greedy(Q, s, epsilon)
-            s2, r, done = env.step(a)
+    q = Q.values  #acesso direto ao array no laço quente
+    explore = agent_rng.random
+    pick = agent_rng.choice
+    record = curve.add if curve is not None else episode_rewards.append
 
-            #atualização TD(0)
-            target = r + (0.0 if done else gamma * np.max(Q[s2]))
-            Q[s][a] += alpha * (target - Q[s][a])
+    for ep in range(start_ep, num_episodes):
+        if prof is not None:
+            #modo instrumentado: mesmo episódio, com cronômetros e contadores
+            G = _train_episode_profiled(env, q, epsilon, alpha, gamma, explore, pick, prof)
+            t_book = time.perf_counter()
+        else:
+            G = train_episode(env, q, epsilon, alpha, gamma, explore, pick)
 
-            s = s2
-            G += r
-
-        episode_rewards.append(G)
+        record(G)
         #contagem de vitórias/derrotas/empates, é bom saber
         if G > 0: wins += 1
         elif G < 0: losses += 1
@@ -60,32 +386,520 @@ def train_q_learning(
         #epsilon vai diminuindo, mas nunca chega a zero
         epsilon = max(eps_end, epsilon * eps_decay)
 
+        if stopper is not None:
+            window_sum += G
+            if (ep + 1) % check_every == 0:
+                reason = stopper.check(q, window_sum / check_every)
+                window_sum = 0.0
+                if reason is not None and ep + 1 < num_episodes:
+                    stop_reason, stopped_episode = reason, ep + 1
+                    break
+
+        if checkpoint_every and (ep + 1) % checkpoint_every == 0 and checkpoint_path:
+            save_checkpoint(checkpoint_path, {
+                "config": config, "episode": ep + 1, "Q": q,
+                "episode_rewards": np.array(episode_rewards, dtype=np.float32), "curve": curve,
+                "epsilon": epsilon, "wins": wins, "losses": losses, "draws": draws,
+                "agent_rng_state": agent_rng.getstate(), "cards": env.cards,
+                "stopper": stopper, "window_sum": window_sum,
+            })
+
+        if prof is not None:
+            prof.times["bookkeeping"] += time.perf_counter() - t_book
+
     stats = {
         "wins": wins, "losses": losses, "draws": draws,
-        "episode_rewards": np.array(episode_rewards, dtype=np.float32),
+        **_reward_stats(episode_rewards, curve),
+        "stopped_episode": stopped_episode, "stop_reason": stop_reason,
         "Q": Q
     }
+    if prof is not None:
+        stats["profile"] = prof.as_dict()
     return Q, stats
 
-def evaluate_policy(Q: Dict[State, np.ndarray], n_episodes: int = 50_000, seed: int = 123):
-    random.seed(seed)
-    np.random.seed(seed)
+CHECKPOINT_VERSION = 5
+
+def save_checkpoint(path: str, state: dict) -> None:
+    #grava num arquivo temporário e troca no fim, pra não deixar checkpoint pela metade
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": CHECKPOINT_VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
 
-    env = BlackjackEnv()
+def load_checkpoint(path: str, config: dict) -> Optional[dict]:
+    #devolve o checkpoint se existir e for da mesma configuração, senão None
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        ckpt = pickle.load(f)
+    if ckpt.get("version") != CHECKPOINT_VERSION or ckpt.get("config") != config:
+        print(f"[Aviso] Checkpoint {path} é de outra configuração; começando do zero.")
+        return None
+    return ckpt
+
+QTABLE_FORMAT = "blackjack-qtable"
+QTABLE_VERSION = 1
+
+def _qtable_paths(path: str) -> Tuple[str, str]:
+    #"run" / "run.npy" -> ("run.npy", "run.json")
+    base = path[:-4] if path.endswith(".npy") else path
+    return base + ".npy", base + ".json"
+
+def save_qtable(path: str, Q: Mapping[State, np.ndarray], meta: Optional[dict] = None) -> str:
+    #salva a Q em disco: <base>.npy com os valores (N_STATES, 2) float32 e <base>.json com
+    #formato/versão, os metadados (hiperparâmetros etc.) e a política gulosa nas duas
+    #tabelas do learned_policy_table (sem e com Ás utilizável). Devolve o caminho do .npy
+    from analysis_utils import learned_policy_table
+    Q = Q if isinstance(Q, QTable) else QTable.from_dict(Q)
+    npy_path, json_path = _qtable_paths(path)
+    sidecar = {
+        "format": QTABLE_FORMAT,
+        "version": QTABLE_VERSION,
+        "n_states": N_STATES,
+        "dtype": "float32",
+        "meta": meta or {},
+        "policy": {
+            "no_ace": learned_policy_table(Q, usable_ace=False).tolist(),
+            "usable_ace": learned_policy_table(Q, usable_ace=True).tolist(),
+        },
+    }
+    #mesmo esquema do checkpoint: escreve em temporário e troca no fim
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, Q.values)
+    with open(json_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(sidecar, f)
+    os.replace(npy_path + ".tmp", npy_path)
+    os.replace(json_path + ".tmp", json_path)
+    return npy_path
+
+def load_qtable(path: str, mmap: bool = True) -> Tuple[QTable, dict]:
+    #lê o que o save_qtable gravou: (QTable, sidecar). Com mmap=True os valores ficam
+    #mapeados do arquivo (somente leitura, nada é copiado); mmap=False carrega uma cópia editável.
+    #as tabelas de política voltam como arrays em sidecar["policy"]
+    npy_path, json_path = _qtable_paths(path)
+    with open(json_path, encoding="utf-8") as f:
+        sidecar = json.load(f)
+    if sidecar.get("format") != QTABLE_FORMAT or sidecar.get("version") != QTABLE_VERSION:
+        raise ValueError(f"{json_path}: formato {sidecar.get('format')} v{sidecar.get('version')} "
+                         f"não suportado (esperado {QTABLE_FORMAT} v{QTABLE_VERSION})")
+    values = np.load(npy_path, mmap_mode="r" if mmap else None)
+    if values.shape != (N_STATES, 2) or values.dtype != np.float32:
+        raise ValueError(f"{npy_path}: esperado float32 {(N_STATES, 2)}, veio {values.dtype} {values.shape}")
+    sidecar["policy"] = {k: np.array(v, dtype=int) for k, v in sidecar["policy"].items()}
+    return QTable(values), sidecar
+
+def _train_q_learning_vec(num_episodes, alpha, gamma, eps_start, eps_end, eps_decay, seed, n_envs,
+                          dealer_mode="simulate", curve_points=0, check_every=0, stopper=None):
+    #mesma ideia do train_q_learning, mas com n_envs jogos em paralelo (VecBlackjackEnv)
+    #quando vários jogos atualizam o mesmo (s, a) no mesmo passo, vale a última escrita.
+    env_seed, agent_seed = np.random.SeedSequence(seed).spawn(2)
+    n_envs = min(n_envs, num_episodes)
+    env = VecBlackjackEnv(n_envs, seed=env_seed, dealer_mode=dealer_mode)
+    explore_u = GroupedStream([np.random.default_rng(agent_seed)], sample_uniform, max(4096, n_envs))
+    Q = QTable()
+    q = Q.values
+
+    curve = StreamingCurve(curve_points) if curve_points > 0 else None
+    episode_rewards = np.zeros(0 if curve else num_episodes, dtype=np.float32)
+    wins = losses = 0
+    n_done = 0
+    window_sum = 0.0
+    last_check = 0
+    next_check = check_every
+    stop_reason = "max_episodes"
+    started = n_envs
+    active = np.ones(n_envs, dtype=bool)  #jogos que ainda contam pro total
+    G = np.zeros(n_envs, dtype=np.float32)
+    epsilon = eps_start
+
+    idx = state_indices(env.reset())
+    while active.any():
+        greedy = (q[idx, 1] > q[idx, 0]).astype(np.int64)
+        #ε-gulosa com um sorteio só: u < ε explora, e aí u < ε/2 (metade das vezes) é pedir
+        u = explore_u.take(env.owner)
+        a = np.where(u < epsilon, u < epsilon / 2, greedy).astype(np.int64)
+
+        obs2, r, done = env.step(a)
+        idx2 = state_indices(obs2)
+
+        #atualização TD(0) só nos jogos ativos
+        target = r + np.where(done, 0.0, gamma * q[idx2].max(axis=1))
+        i, ai = idx[active], a[active]
+        q[i, ai] += alpha * (target[active] - q[i, ai])
+
+        G += r
+        finished = np.flatnonzero(done & active)
+        if finished.size:
+            g = G[finished]
+            if curve is not None:
+                curve.extend(g)
+            else:
+                episode_rewards[n_done:n_done + finished.size] = g
+            wins += int((g > 0).sum())
+            losses += int((g < 0).sum())
+            n_done += finished.size
+            window_sum += float(g.sum())
+            #epsilon decai uma vez por episódio terminado
+            epsilon = max(eps_end, epsilon * eps_decay ** finished.size)
+            #jogos novos só até completar num_episodes
+            keep = min(finished.size, num_episodes - started)
+            started += keep
+            active[finished[keep:]] = False
+        G[done] = 0.0
+        idx = idx2
+
+        #parada antecipada: checa quando passa de cada múltiplo de check_every
+        if stopper is not None and n_done >= next_check:
+            reason = stopper.check(q, window_sum / (n_done - last_check))
+            window_sum = 0.0
+            last_check = n_done
+            next_check = (n_done // check_every + 1) * check_every
+            if reason is not None and n_done < num_episodes:
+                stop_reason = reason
+                break
+
+    stats = {
+        "wins": wins, "losses": losses, "draws": n_done - wins - losses,
+        **_reward_stats(episode_rewards[:n_done], curve),
+        "stopped_episode": n_done, "stop_reason": stop_reason,
+        "Q": Q
+    }
+    return Q, stats
+
+def train_q_learning_batched(num_episodes, alpha, gamma=1.0, eps_start=1.0, eps_end=0.05, eps_decay=0.9995,
+                             seed=42, n_envs: int = 256, dealer_mode: str = "simulate",
+                             curve_points: int = 0):
+    #treina várias configurações de uma vez: Q empilhada em q[config, estado, ação], com
+    #n_envs jogos por configuração andando juntos e a atualização TD de todas numa operação só.
+    #num_episodes/alpha/gamma/eps_*/seed podem ser escalares ou um valor por configuração
+    #(o nº de configurações é o tamanho do maior vetor). Cada configuração tem seu ε, que decai
+    #a cada episódio dela, e ambiente/RNG próprios derivados da sua seed: o resultado de uma
+    #configuração não depende das outras que estão no mesmo lote.
+    #n_envs=1 é o Q-learning sequencial exato de cada config, mas o custo fixo do numpy por passo
+    #domina e fica mais lento que treinar as configs uma por uma; o ganho aparece com n_envs na
+    #casa das centenas (aí vale a última escrita quando dois jogos atualizam o mesmo (s, a)).
+    #devolve uma lista de (Q, stats), um por configuração, no formato do train_q_learning
+    params = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in
+                                   (num_episodes, alpha, gamma, eps_start, eps_end, eps_decay, seed)))
+    budget, alpha, gamma, eps_start, eps_end, eps_decay, seeds = (np.atleast_1d(x).copy() for x in params)
+    budget = budget.astype(np.int64)
+    k = len(budget)
+    m = max(1, min(n_envs, int(budget.min())))
+
+    #mesma divisão de seeds do _train_q_learning_vec, uma vez por configuração; um ambiente só
+    #com os k*m jogos, mas cartas e exploração de cada configuração saem dos blocos dela
+    env_seeds, agent_seeds = zip(*(np.random.SeedSequence(int(s)).spawn(2) for s in seeds))
+    env = VecBlackjackEnv(k * m, seed=list(env_seeds), dealer_mode=dealer_mode)
+    explore_u = GroupedStream([np.random.default_rng(s) for s in agent_seeds], sample_uniform, max(4096, m))
+    owner = env.owner
+    q = np.zeros((k, N_STATES, 2), dtype=np.float32)
+    #por jogo, pra não indexar a cada passo; float32 como no _train_q_learning_vec (mesmas contas)
+    alpha_e, gamma_e = alpha[owner].astype(np.float32), gamma[owner].astype(np.float32)
+
+    curves = [StreamingCurve(curve_points) for _ in range(k)] if curve_points > 0 else None
+    rewards = None if curves else np.zeros((k, int(budget.max())), dtype=np.float32)
+    wins = np.zeros(k, dtype=np.int64)
+    losses = np.zeros(k, dtype=np.int64)
+    n_done = np.zeros(k, dtype=np.int64)
+    started = np.full(k, m, dtype=np.int64)
+    active = np.ones(k * m, dtype=bool)
+    G = np.zeros(k * m, dtype=np.float32)
+    epsilon = eps_start.copy()
+
+    #q achatada: a célula (config, estado, ação) de cada jogo vira um índice só
+    qf = q.reshape(-1)
+    base = owner * (N_STATES * 2)
+    row = base + 2 * state_indices(env.reset())
+    while active.any():
+        greedy = qf[row + 1] > qf[row]
+        #mesma ε-gulosa do _train_q_learning_vec, com o ε da configuração de cada jogo
+        u = explore_u.take(owner)
+        eps = epsilon[owner]
+        a = np.where(u < eps, u < eps / 2, greedy)
+        obs2, r, done = env.step(a)
+        row2 = base + 2 * state_indices(obs2)
+
+        #TD(0) por configuração (alpha/gamma de cada uma), só nos jogos ativos
+        target = r + np.where(done, 0.0, gamma_e * np.maximum(qf[row2], qf[row2 + 1]))
+        cell = (row + a)[active]
+        qf[cell] += alpha_e[active] * (target[active] - qf[cell])
+
+        G += r
+        finished = np.flatnonzero(done & active)
+        if finished.size:
+            fo = owner[finished]
+            g = G[finished]
+            counts = np.bincount(fo, minlength=k)
+            if curves is not None:
+                for c in np.flatnonzero(counts):
+                    curves[c].extend(g[fo == c])
+            else:
+                #posição de cada episódio dentro da sua config (finished vem ordenado por dono)
+                first = np.cumsum(counts) - counts
+                rank = np.arange(finished.size) - first[fo]
+                rewards[fo, n_done[fo] + rank] = g
+            wins += np.bincount(fo, weights=g > 0, minlength=k).astype(np.int64)
+            losses += np.bincount(fo, weights=g < 0, minlength=k).astype(np.int64)
+            n_done += counts
+            epsilon = np.maximum(eps_end, epsilon * eps_decay ** counts)
+            #jogos novos só até cada config completar o seu num_episodes
+            first = np.cumsum(counts) - counts
+            rank = np.arange(finished.size) - first[fo]
+            room = budget - started
+            active[finished[rank >= room[fo]]] = False
+            started += np.minimum(counts, room)
+        G[done] = 0.0
+        row = row2
+
+    out = []
+    for c in range(k):
+        Q = QTable(q[c])
+        stats = {
+            "wins": int(wins[c]), "losses": int(losses[c]), "draws": int(n_done[c] - wins[c] - losses[c]),
+            **_reward_stats(rewards[c, :n_done[c]] if curves is None else None,
+                            curves[c] if curves is not None else None),
+            "stopped_episode": int(n_done[c]), "stop_reason": "max_episodes",
+            "Q": Q,
+        }
+        out.append((Q, stats))
+    return out
+
+def greedy_policy(Q: Mapping[State, np.ndarray]) -> np.ndarray:
+    #política gulosa como array denso: policy[state_index(s)] = argmax Q[s]
+    #estados que não existem em Q ficam com 0 (parar), igual argmax de zeros
+    if isinstance(Q, QTable):
+        return (Q.values[:, 1] > Q.values[:, 0]).astype(np.int8)
+    policy = np.zeros(N_STATES, dtype=np.int8)
+    for s, q in Q.items():
+        policy[state_index(s)] = int(np.argmax(q))
+    return policy
+
+def evaluate_policies_batched(Qs, n_episodes: int = 50_000, seed: int = 123, n_envs: int = 4096,
+                              confidence: float = 0.95):
+    #avaliação gulosa de várias Q-tables de uma vez: cada Q vira um array denso de
+    #política e todas jogam juntas num único VecBlackjackEnv (n_envs jogos por Q),
+    #com a ação escolhida por indexação policies[dono, estado].
+    #devolve uma lista de dicts (mesmo formato do evaluate_policy), um por Q
+    policies = np.stack([greedy_policy(Q) for Q in Qs])
+    ret_sum, sq_sum, wins, losses = _batched_totals(policies, n_episodes, seed, n_envs)
+    return [summarize_totals(n_episodes, ret_sum[j], sq_sum[j], wins[j], losses[j], confidence)
+            for j in range(len(policies))]
+
+def _batched_totals(policies: np.ndarray, n_episodes: int, seed, n_envs: int):
+    #joga n_episodes por política (policies[k, N_STATES]) e devolve, por política,
+    #(soma dos retornos, soma dos quadrados, vitórias, derrotas)
+    k = len(policies)
+    m = min(n_envs, n_episodes)
+    env = VecBlackjackEnv(k * m, seed=seed)
+    owner = np.repeat(np.arange(k), m)
+
+    started = np.full(k, m)
+    active = np.ones(k * m, dtype=bool)
+    G = np.zeros(k * m, dtype=np.float32)
+    ret_sum = np.zeros(k)
+    sq_sum = np.zeros(k)
+    wins = np.zeros(k, dtype=np.int64)
+    losses = np.zeros(k, dtype=np.int64)
+
+    obs = env.reset()
+    while active.any():
+        obs, r, done = env.step(policies[owner, state_indices(obs)])
+        G += r
+        finished = np.flatnonzero(done & active)
+        if finished.size:
+            o = owner[finished]
+            g = G[finished].astype(np.float64)
+            ret_sum += np.bincount(o, weights=g, minlength=k)
+            sq_sum += np.bincount(o, weights=g * g, minlength=k)
+            wins += np.bincount(o, weights=g > 0, minlength=k).astype(np.int64)
+            losses += np.bincount(o, weights=g < 0, minlength=k).astype(np.int64)
+            #jogos novos só até cada Q completar n_episodes
+            counts = np.bincount(o, minlength=k)
+            first = np.cumsum(counts) - counts
+            rank = np.arange(finished.size) - first[o]
+            room = n_episodes - started
+            active[finished[rank >= room[o]]] = False
+            started += np.minimum(counts, room)
+        G[done] = 0.0
+    return ret_sum, sq_sum, wins, losses
+
+def evaluate_policy(Q: Mapping[State, np.ndarray], n_episodes: int = 50_000, seed: int = 123, n_envs: int = 1,
+                    profile: bool = False, ci_halfwidth: Optional[float] = None, batch_size: int = 10_000,
+                    confidence: float = 0.95):
+    #profile=True: o dict volta com "profile" (tempos de env_step/action + contadores)
+    #ci_halfwidth: joga em lotes de batch_size e para assim que o intervalo de confiança
+    #do avg_return tiver meia-largura <= ci_halfwidth (n_episodes vira o teto).
+    #o dict sempre traz "episodes" (jogados de fato), "ci_low" e "ci_high"
+    if profile and (n_envs > 1 or ci_halfwidth is not None):
+        raise ValueError("profile só é suportado no modo escalar (n_envs=1) e sem ci_halfwidth")
+    if ci_halfwidth is not None:
+        return _evaluate_adaptive(Q, n_episodes, seed, n_envs, ci_halfwidth, batch_size, confidence)
+    if n_envs > 1:
+        return evaluate_policies_batched([Q], n_episodes, seed, n_envs, confidence)[0]
+
+    policy = greedy_policy(Q).tolist()
+    env = FastBlackjackEnv(seed=seed)
+    if profile:
+        prof = PhaseProfiler()
+        rewards = [_eval_episode_profiled(env, policy, prof) for _ in range(n_episodes)]
+        return {**_summarize_returns(np.array(rewards, dtype=np.float32), confidence), "profile": prof.as_dict()}
+    return _summarize_returns(_play_greedy(env, policy, n_episodes), confidence)
+
+def _play_greedy(env, policy, n_episodes: int) -> np.ndarray:
+    #joga n_episodes seguidos no env escalar com a política densa (lista) e devolve os retornos
     rewards = []
     for ep in range(n_episodes):
         s = env.reset()
         done = False
         G = 0.0
         while not done:
-            a = int(np.argmax(Q[s]))
+            a = policy[state_index(s)]
             s, r, done = env.step(a)
             G += r
         rewards.append(G)
-    rewards = np.array(rewards, dtype=np.float32)
+    return np.array(rewards, dtype=np.float32)
+
+def _evaluate_adaptive(Q, max_episodes: int, seed: int, n_envs: int, ci_halfwidth: float,
+                       batch_size: int, confidence: float):
+    #avaliação em lotes com média/variância acumuladas; para quando o IC fica estreito
+    #o bastante ou quando chega em max_episodes. No escalar o mesmo env segue entre os
+    #lotes (os episódios são um prefixo da avaliação fixa com a mesma seed); no vetorizado
+    #cada lote usa uma seed filha de SeedSequence(seed)
+    if batch_size <= 0:
+        raise ValueError("batch_size precisa ser > 0")
+    policy = greedy_policy(Q)
+    if n_envs > 1:
+        seeds = np.random.SeedSequence(seed)
+    else:
+        env = FastBlackjackEnv(seed=seed)
+        policy_list = policy.tolist()
+    n, ret_sum, sq_sum, wins, losses = 0, 0.0, 0.0, 0, 0
+    while n < max_episodes:
+        b = min(batch_size, max_episodes - n)
+        if n_envs > 1:
+            totals = _batched_totals(policy[None], b, seeds.spawn(1)[0], n_envs)
+            bs, bq, bw, bl = (float(t[0]) for t in totals)
+        else:
+            g = _play_greedy(env, policy_list, b).astype(np.float64)
+            bs, bq, bw, bl = g.sum(), (g * g).sum(), (g > 0).sum(), (g < 0).sum()
+        n += b
+        ret_sum += bs
+        sq_sum += bq
+        wins += int(bw)
+        losses += int(bl)
+        if n > 1 and mean_ci_halfwidth(n, ret_sum, sq_sum, confidence) <= ci_halfwidth:
+            break
+    return summarize_totals(n, ret_sum, sq_sum, wins, losses, confidence)
+
+def mean_ci_halfwidth(n: int, ret_sum: float, sq_sum: float, confidence: float) -> float:
+    #meia-largura do IC normal da média (variância amostral a partir das somas)
+    if n < 2:
+        return math.inf
+    from statistics import NormalDist  #statistics é lento de importar; só quando precisa
+    mean = ret_sum / n
+    var = max(0.0, (sq_sum - n * mean * mean) / (n - 1))
+    return NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(var / n)
+
+def _eval_episode_profiled(env, policy, prof) -> float:
+    #um episódio guloso cronometrado (a "consulta à Q" aqui é a leitura na política densa)
+    times, counts = prof.times, prof.counts
+    clock = time.perf_counter
+    cards = env.cards
+    t0 = clock()
+    s = env.reset()
+    times["env_step"] += clock() - t0
+    done = False
+    G = 0.0
+    while not done:
+        t0 = clock()
+        a = policy[state_index(s)]
+        t1 = clock()
+        drawn = cards.drawn
+        s, r, done = env.step(a)
+        times["env_step"] += clock() - t1
+        times["action"] += t1 - t0
+        if a == 0:
+            counts["dealer_draws"] += cards.drawn - drawn
+        counts["env_steps"] += 1
+        counts["q_lookups"] += 1
+        G += r
+    counts["episodes"] += 1
+    return G
+
+def _summarize_returns(rewards: np.ndarray, confidence: float = 0.95):
+    #taxas de vitória/empate/derrota a partir dos retornos
+    n = len(rewards)
+    mean = float(rewards.mean())
+    half = mean_ci_halfwidth(n, float(rewards.sum(dtype=np.float64)),
+                             float(np.square(rewards, dtype=np.float64).sum()), confidence)
     return {
-        "avg_return": float(rewards.mean()),
+        "avg_return": mean,
         "win_rate": float((rewards > 0).mean()),
         "draw_rate": float((rewards == 0).mean()),
         "loss_rate": float((rewards < 0).mean()),
-    }
\ No newline at end of file
+        "episodes": n,
+        "ci_low": mean - half,
+        "ci_high": mean + half,
+    }
+
+def summarize_totals(n: int, ret_sum: float, sq_sum: float, wins: int, losses: int, confidence: float):
+    #mesmo dict do _summarize_returns, a partir das somas acumuladas
+    mean = float(ret_sum / n)
+    half = mean_ci_halfwidth(n, ret_sum, sq_sum, confidence)
+    return {
+        "avg_return": mean,
+        "win_rate": float(wins / n),
+        "draw_rate": float((n - wins - losses) / n),
+        "loss_rate": float(losses / n),
+        "episodes": n,
+        "ci_low": mean - half,
+        "ci_high": mean + half,
+    }
+
+def evaluate_policy_exact(Q: Mapping[State, np.ndarray]):
+    #avaliação exata da política gulosa (sem Monte Carlo): programação dinâmica
+    #sobre as somas do jogador + distribuição final do dealer por carta aberta.
+    #devolve o mesmo dict do evaluate_policy, agora com as probabilidades exatas
+    policy = greedy_policy(Q)
+    dealer = dealer_outcome_table()
+    memo = {}
+
+    def outcome(raw: int, ace: bool, d_up: int) -> np.ndarray:
+        #(P(vitória), P(empate), P(derrota)) jogando a política a partir daqui
+        key = (raw, ace, d_up)
+        if key in memo:
+            return memo[key]
+        usable = ace and raw + 10 <= 21
+        total = raw + 10 if usable else raw
+        if policy[state_index((total, d_up, int(usable)))] == 0:
+            #parar: compara com o total final do dealer
+            d = dealer[d_up]
+            win = d[-1] + sum(d[t - 17] for t in range(17, 22) if t < total)
+            draw = d[total - 17] if total >= 17 else 0.0
+            res = np.array([win, draw, 1.0 - win - draw])
+        else:
+            res = np.zeros(3)
+            for c, p in CARD_PROBS.items():
+                if raw + c > 21:
+                    res[2] += p  #estourou
+                else:
+                    res += p * outcome(raw + c, ace or c == 1, d_up)
+        memo[key] = res
+        return res
+
+    total = np.zeros(3)
+    for c1, p1 in CARD_PROBS.items():
+        for c2, p2 in CARD_PROBS.items():
+            for d_up, pd in CARD_PROBS.items():
+                total += p1 * p2 * pd * outcome(c1 + c2, c1 == 1 or c2 == 1, d_up)
+    win, draw, loss = (float(x) for x in total)
+    #valor exato: nenhum episódio jogado e intervalo de largura zero
+    return {
+        "avg_return": win - loss,
+        "win_rate": win,
+        "draw_rate": draw,
+        "loss_rate": loss,
+        "episodes": 0,
+        "ci_low": win - loss,
+        "ci_high": win - loss,
+    }
@@ -0,0 +1,121 @@
+#gera os PNGs das curvas de aprendizagem a partir dos .npz salvos pelo experiments.py
+#(--save-curves). O treino não espera pelo matplotlib e os dados ficam guardados.
+
+#como usar:
+#   python render_curves.py curves                          # um PNG por .npz, ao lado dele
+#   python render_curves.py curves --workers 8 --out-dir plots
+#   python render_curves.py curves/curve_alpha0.1_*.npz --overlay alpha01.png --title "alpha=0.1"
+
+#PNGs cujo .npz não mudou (mesmo hash) são pulados; --force refaz tudo.
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from analysis_utils import load_curve_data, plot_curves
+
+MANIFEST = "render_manifest.json"
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _collect(inputs: List[str]) -> List[str]:
+    #aceita pastas, arquivos e globs; devolve os .npz em ordem estável
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += glob.glob(os.path.join(item, "*.npz"))
+        else:
+            paths += glob.glob(item) or [item]
+    return sorted(set(p for p in paths if p.endswith(".npz")))
+
+def _load_manifest(out_dir: str) -> Dict[str, str]:
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_manifest(out_dir: str, manifest: Dict[str, str]):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def _render(task: Tuple[List[str], str, str]) -> bool:
+    #roda no worker: lê os .npz e desenha todos na mesma figura; devolve se o PNG foi salvo
+    npz_paths, png_path, title = task
+    return plot_curves([load_curve_data(p) for p in npz_paths], png_path, title=title)
+
+def main():
+    parser = argparse.ArgumentParser(description="Renderiza as curvas de aprendizagem salvas em .npz.")
+    parser.add_argument("inputs", nargs="+", help="pastas, arquivos .npz ou globs")
+    parser.add_argument("--out-dir", type=str, default="", dest="out_dir",
+                        help="pasta dos PNGs (padrão: a mesma do .npz)")
+    parser.add_argument("--overlay", type=str, default="",
+                        help="em vez de um PNG por curva, sobrepõe todas nesse arquivo")
+    parser.add_argument("--title", type=str, default="", help="título do gráfico (--overlay)")
+    parser.add_argument("--workers", type=int, default=1, help="processos para renderizar em paralelo")
+    parser.add_argument("--force", action="store_true", help="renderiza mesmo se os dados não mudaram")
+    args = parser.parse_args()
+
+    npz_paths = _collect(args.inputs)
+    if not npz_paths:
+        print("[Aviso] nenhum .npz encontrado.")
+        return
+    hashes = {p: _file_hash(p) for p in npz_paths}
+
+    #tarefas (entradas, png, título) + hash dos dados de cada uma
+    if args.overlay:
+        out_dir = os.path.dirname(args.overlay) or "."
+        tasks = [(npz_paths, args.overlay, args.title)]
+        task_hash = [hashlib.sha1((args.title + "".join(hashes[p] for p in npz_paths)).encode()).hexdigest()]
+    else:
+        tasks, task_hash = [], []
+        for p in npz_paths:
+            png_dir = args.out_dir or os.path.dirname(p) or "."
+            tasks.append(([p], os.path.join(png_dir, os.path.basename(p)[:-4] + ".png"), ""))
+            task_hash.append(hashes[p])
+
+    #um manifesto por pasta de saída: nome do PNG -> hash dos dados que o geraram
+    manifests: Dict[str, Dict[str, str]] = {}
+    todo, todo_hash = [], []
+    for task, h in zip(tasks, task_hash):
+        png = task[1]
+        out_dir = os.path.dirname(png) or "."
+        os.makedirs(out_dir, exist_ok=True)
+        manifest = manifests.setdefault(out_dir, _load_manifest(out_dir))
+        if not args.force and os.path.exists(png) and manifest.get(os.path.basename(png)) == h:
+            continue
+        todo.append(task)
+        todo_hash.append(h)
+    print(f"== {len(todo)} gráfico(s) para gerar, {len(tasks) - len(todo)} sem mudança ==")
+
+    if args.workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            done = list(pool.map(_render, todo))
+    else:
+        done = [_render(t) for t in todo]
+
+    #só registra o que foi desenhado agora: se o gráfico foi pulado (sem matplotlib), um PNG
+    #antigo no mesmo lugar não pode ficar marcado como feito com os dados novos
+    for (_, png, _), saved, h in zip(todo, done, todo_hash):
+        if saved:
+            manifests[os.path.dirname(png) or "."][os.path.basename(png)] = h
+            print(f"[OK] {png}")
+    for out_dir, manifest in manifests.items():
+        _save_manifest(out_dir, manifest)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#banco SQLite para os resultados dos experimentos (alternativa/complemento ao CSV)
+#tabelas: configs (hiperparâmetros), runs (um treino = config + seed) e evaluations
+#(avaliações de um run). Índices nos hiperparâmetros e na seed; WAL + busy_timeout
+#para aguentar vários processos escrevendo ao mesmo tempo.
+
+#como usar:
+#   python experiments.py --db results.db ...                 # grava cada execução também no banco
+#   python results_db.py import-csv results.db experiments_results.csv results.csv
+#   python results_db.py summary results.db                   # média e IC 95% por configuração
+#   python results_db.py summary results.db --by alpha --metric win_rate --gamma 1.0
+#   python results_db.py sql results.db "SELECT COUNT(*) FROM runs"
+
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    id INTEGER PRIMARY KEY,
+    alpha REAL NOT NULL,
+    gamma REAL NOT NULL,
+    episodes INTEGER NOT NULL,
+    eps_start REAL NOT NULL,
+    eps_end REAL NOT NULL,
+    eps_decay REAL NOT NULL,
+    dealer_mode TEXT NOT NULL DEFAULT 'simulate',
+    UNIQUE (alpha, gamma, episodes, eps_start, eps_end, eps_decay, dealer_mode)
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    config_id INTEGER NOT NULL REFERENCES configs(id),
+    seed INTEGER NOT NULL,
+    wins INTEGER, losses INTEGER, draws INTEGER,
+    train_time_s REAL,
+    stopped_episode INTEGER,
+    stop_reason TEXT,
+    rung INTEGER,
+    curve_path TEXT,
+    qtable_path TEXT,
+    q_star_dist REAL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    mode TEXT NOT NULL,
+    episodes INTEGER,
+    win_rate REAL, draw_rate REAL, loss_rate REAL, avg_return REAL,
+    ci_low REAL, ci_high REAL,
+    eval_time_s REAL
+);
+CREATE INDEX IF NOT EXISTS idx_configs_hparams ON configs (alpha, gamma, episodes);
+CREATE INDEX IF NOT EXISTS idx_runs_config_seed ON runs (config_id, seed);
+CREATE INDEX IF NOT EXISTS idx_runs_seed ON runs (seed);
+CREATE INDEX IF NOT EXISTS idx_evaluations_run ON evaluations (run_id, mode);
+"""
+
+CONFIG_FIELDS = ("alpha", "gamma", "episodes", "eps_start", "eps_end", "eps_decay", "dealer_mode")
+RUN_FIELDS = ("seed", "wins", "losses", "draws", "train_time_s", "stopped_episode", "stop_reason",
+              "rung", "curve_path", "qtable_path", "q_star_dist")
+EVAL_FIELDS = ("episodes", "win_rate", "draw_rate", "loss_rate", "avg_return", "ci_low", "ci_high",
+               "eval_time_s")
+METRICS = ("avg_return", "win_rate", "draw_rate", "loss_rate", "q_star_dist", "train_time_s")
+
+#t de Student bicaudal 95% (gl 1..30); acima disso usa 1.96
+_T95 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+def connect(path: str, timeout: float = 30.0) -> sqlite3.Connection:
+    #abre (e cria, se precisar) o banco; WAL deixa leitores e um escritor ao mesmo tempo,
+    #busy_timeout faz os outros escritores esperarem em vez de falhar
+    conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0:
+        #cria o esquema dentro de uma transação (outro processo pode estar criando junto)
+        conn.execute("BEGIN IMMEDIATE")
+        for stmt in filter(str.strip, SCHEMA.split(";")):
+            conn.execute(stmt)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.execute("COMMIT")
+    elif version != SCHEMA_VERSION:
+        raise ValueError(f"{path}: esquema v{version}, esperado v{SCHEMA_VERSION}")
+    return conn
+
+def _value(v):
+    #CSV traz tudo como texto; vazio vira NULL
+    if v is None or v == "":
+        return None
+    if isinstance(v, str):
+        for cast in (int, float):
+            try:
+                return cast(v)
+            except ValueError:
+                pass
+    return v
+
+def add_result(conn: sqlite3.Connection, result: Dict[str, object], eval_mode: str = "mc") -> int:
+    #grava um resultado (dict com as colunas do CSV do experiments.py) numa transação só;
+    #devolve o id do run
+    r = {k: _value(v) for k, v in result.items()}
+    r.setdefault("dealer_mode", "simulate")
+    if r["dealer_mode"] is None:
+        r["dealer_mode"] = "simulate"
+    config = [r.get(k) for k in CONFIG_FIELDS]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"INSERT OR IGNORE INTO configs ({', '.join(CONFIG_FIELDS)}) "
+                     f"VALUES ({', '.join('?' * len(CONFIG_FIELDS))})", config)
+        config_id = conn.execute(
+            "SELECT id FROM configs WHERE " + " AND ".join(f"{k} = ?" for k in CONFIG_FIELDS), config
+        ).fetchone()[0]
+        run_id = conn.execute(
+            f"INSERT INTO runs (config_id, {', '.join(RUN_FIELDS)}, created_at) "
+            f"VALUES (?, {', '.join('?' * len(RUN_FIELDS))}, ?)",
+            [config_id] + [r.get(k) for k in RUN_FIELDS] + [time.strftime("%Y-%m-%dT%H:%M:%S")],
+        ).lastrowid
+        ev = dict(r, episodes=r.get("eval_episodes"))
+        conn.execute(
+            f"INSERT INTO evaluations (run_id, mode, {', '.join(EVAL_FIELDS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(EVAL_FIELDS))})",
+            [run_id, eval_mode] + [ev.get(k) for k in EVAL_FIELDS],
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return run_id
+
+def import_csv(conn: sqlite3.Connection, path: str, eval_mode: str = "mc") -> int:
+    #importa um CSV do experiments.py (versões antigas sem as colunas novas também)
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        add_result(conn, row, eval_mode)
+    return len(rows)
+
+def summarize(conn: sqlite3.Connection, by: Sequence[str] = ("alpha", "gamma", "episodes"),
+              metric: str = "avg_return", filters: Optional[Dict[str, Iterable]] = None,
+              mode: Optional[str] = None) -> List[Dict[str, object]]:
+    #média, desvio e IC 95% (t de Student) da métrica entre as seeds, por configuração
+    if metric not in METRICS:
+        raise ValueError(f"métrica desconhecida: {metric} (use {', '.join(METRICS)})")
+    if any(k not in CONFIG_FIELDS for k in by):
+        raise ValueError(f"agrupamento inválido: {by} (use {', '.join(CONFIG_FIELDS)})")
+    #métricas do treino (q_star_dist, train_time_s) vêm só de runs, uma vez por run; as da
+    #avaliação vêm de evaluations, uma vez por avaliação (um run pode ter várias)
+    run_metric = metric in ("q_star_dist", "train_time_s")
+    where, params = [f"{'r' if run_metric else 'e'}.{metric} IS NOT NULL"], []
+    for k, values in (filters or {}).items():
+        values = list(values)
+        table = "r" if k == "seed" else "c"
+        where.append(f"{table}.{k} IN ({', '.join('?' * len(values))})")
+        params += values
+    if mode:
+        where.append("EXISTS (SELECT 1 FROM evaluations m WHERE m.run_id = r.id AND m.mode = ?)" if run_metric
+                     else "e.mode = ?")
+        params.append(mode)
+    cols = ", ".join(f"c.{k}" for k in by)
+    x = f"{'r' if run_metric else 'e'}.{metric}"
+    join = "" if run_metric else "JOIN evaluations e ON e.run_id = r.id "
+    sql = (f"SELECT {cols}, {x} AS x FROM runs r JOIN configs c ON c.id = r.config_id {join}"
+           f"WHERE {' AND '.join(where)} ORDER BY {cols}")
+    #média/variância por grupo com Welford (AVG(x*x) - AVG(x)^2 perde precisão quando o
+    #desvio é pequeno perto da média); as linhas já vêm ordenadas por grupo
+    groups = []
+    for row in conn.execute(sql, params):
+        key = tuple(row[k] for k in by)
+        if not groups or groups[-1][0] != key:
+            groups.append([key, 0, 0.0, 0.0])
+        g = groups[-1]
+        g[1] += 1
+        delta = row["x"] - g[2]
+        g[2] += delta / g[1]
+        g[3] += delta * (row["x"] - g[2])
+    out = []
+    for key, n, mean, m2 in groups:
+        var = m2 / (n - 1) if n > 1 else 0.0
+        half = (_T95[n - 2] if n - 1 <= len(_T95) else 1.96) * math.sqrt(var / n) if n > 1 else float("nan")
+        out.append({**dict(zip(by, key)), "n": n, "mean": mean, "std": math.sqrt(var),
+                    "ci_low": mean - half, "ci_high": mean + half})
+    return out
+
+def _print_table(rows: List[Dict[str, object]]):
+    if not rows:
+        print("(nenhum resultado)")
+        return
+    cols = list(rows[0])
+    fmt = lambda v: f"{v:.5f}" if isinstance(v, float) else str(v)
+    widths = [max(len(c), *(len(fmt(r[c])) for r in rows)) for c in cols]
+    print("  ".join(c.rjust(w) for c, w in zip(cols, widths)))
+    for r in rows:
+        print("  ".join(fmt(r[c]).rjust(w) for c, w in zip(cols, widths)))
+
+def _parse_list(s: str, cast):
+    return [cast(x.strip()) for x in s.split(",") if x.strip()] if s else []
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta/importa resultados dos experimentos (SQLite).")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("import-csv", help="importa CSVs do experiments.py")
+    p.add_argument("db")
+    p.add_argument("csvs", nargs="+")
+    p.add_argument("--eval-mode", type=str, default="mc", dest="eval_mode",
+                   help="modo de avaliação dos CSVs (não fica no CSV)")
+
+    p = sub.add_parser("summary", help="média e IC 95%% de uma métrica por configuração")
+    p.add_argument("db")
+    p.add_argument("--by", type=str, default="alpha,gamma,episodes", help="colunas de configs para agrupar")
+    p.add_argument("--metric", type=str, default="avg_return", choices=METRICS)
+    p.add_argument("--mode", type=str, default="", help="só avaliações desse modo (mc/exact/batched)")
+    p.add_argument("--alpha", type=str, default="", help="filtro, ex.: 0.05,0.1")
+    p.add_argument("--gamma", type=str, default="")
+    p.add_argument("--episodes", type=str, default="")
+    p.add_argument("--seed", type=str, default="")
+
+    p = sub.add_parser("sql", help="roda uma consulta SQL qualquer")
+    p.add_argument("db")
+    p.add_argument("query")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    t0 = time.perf_counter()
+    if args.cmd == "import-csv":
+        for path in args.csvs:
+            print(f"[OK] {import_csv(conn, path, args.eval_mode)} linhas de {path}")
+    elif args.cmd == "summary":
+        filters = {k: v for k, v in (("alpha", _parse_list(args.alpha, float)),
+                                     ("gamma", _parse_list(args.gamma, float)),
+                                     ("episodes", _parse_list(args.episodes, int)),
+                                     ("seed", _parse_list(args.seed, int))) if v}
+        _print_table(summarize(conn, _parse_list(args.by, str), args.metric, filters, args.mode or None))
+    else:
+        _print_table([dict(r) for r in conn.execute(args.query)])
+    print(f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#solução ótima do blackjack por iteração de valor (baseado no modelo, sem simular nada)
+#as regras do BlackjackEnv são conhecidas (baralho infinito, dealer compra até 17), então
+#dá pra calcular Q* direto no mesmo espaço de estados (player_sum, dealer_upcard, usable_ace).
+
+#como usar:
+#   python solver.py                      # imprime a política ótima e o valor esperado
+#   python solver.py --save q_star        # salva Q* com save_qtable (q_star.npy + q_star.json)
+
+from __future__ import annotations
+
+import argparse
+from functools import lru_cache
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+from env_blackjack import CARD_PROBS, N_STATES, PLAYER_SUM_MAX, stick_tables, state_index
+from qlearning import QTable, State
+
+#estados de decisão usados na distância até Q*: somas 4..21 (com Ás utilizável só de 12 pra cima)
+DECISION_STATES = np.array([state_index((p_sum, d_up, ace))
+                            for p_sum in range(4, 22) for d_up in range(1, 11) for ace in (0, 1)
+                            if not (ace and p_sum < 12)])
+
+@lru_cache(maxsize=None)
+def _hit_model() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    #modelo do "pedir" para cada estado: P[s, s'] (continua o jogo), bust[s] (estoura)
+    #e valid[s] (soma <= 21). Sem Ás utilizável e soma <= 11 não existe Ás na mão, e com soma
+    #>= 12 um Ás não utilizável nunca volta a ser utilizável, então (soma, Ás utilizável) basta
+    P = np.zeros((N_STATES, N_STATES))
+    bust = np.zeros(N_STATES)
+    valid = np.zeros(N_STATES, dtype=bool)
+    for p_sum in range(PLAYER_SUM_MAX + 1):
+        for d_up in range(1, 11):
+            for ace in (0, 1):
+                if p_sum > 21 or (ace and p_sum < 12):
+                    continue
+                i = state_index((p_sum, d_up, ace))
+                valid[i] = True
+                raw = p_sum - 10 if ace else p_sum
+                for c, p in CARD_PROBS.items():
+                    new_raw = raw + c
+                    if new_raw > 21:
+                        bust[i] += p
+                        continue
+                    has_ace = bool(ace) or c == 1
+                    usable = has_ace and new_raw + 10 <= 21
+                    P[i, state_index((new_raw + 10 if usable else new_raw, d_up, int(usable)))] += p
+    for a in (P, bust, valid):
+        a.setflags(write=False)
+    return P, bust, valid
+
+def _stick_values() -> np.ndarray:
+    #recompensa esperada de parar em cada estado (tabela do dealer)
+    _, expected = stick_tables()
+    out = np.zeros(N_STATES)
+    for p_sum in range(22):
+        for d_up in range(1, 11):
+            for ace in (0, 1):
+                out[state_index((p_sum, d_up, ace))] = expected[d_up, p_sum]
+    return out
+
+def value_iteration(gamma: float = 1.0, tol: float = 1e-12, max_iter: int = 1000) -> Tuple[QTable, dict]:
+    #Q*(s, parar) = E[recompensa do stick]; Q*(s, pedir) = -P(estourar) + gamma * sum P(s'|s) V*(s')
+    #devolve (Q*, info) com nº de iterações e o último delta; estados impossíveis ficam com 0
+    P, bust, valid = _hit_model()
+    q_stick = np.where(valid, _stick_values(), 0.0)
+    V = np.zeros(N_STATES)
+    delta = np.inf
+    it = 0
+    while it < max_iter and delta > tol:
+        q_hit = np.where(valid, -bust + gamma * (P @ V), 0.0)
+        new_V = np.maximum(q_stick, q_hit)
+        delta = float(np.abs(new_V - V).max())
+        V = new_V
+        it += 1
+    q_hit = np.where(valid, -bust + gamma * (P @ V), 0.0)
+    return QTable(np.stack([q_stick, q_hit], axis=1)), {"iterations": it, "delta": delta}
+
+@lru_cache(maxsize=None)
+def _q_star_values(gamma: float) -> np.ndarray:
+    values = value_iteration(gamma)[0].values
+    values.setflags(write=False)
+    return values
+
+def optimal_q(gamma: float = 1.0) -> QTable:
+    #Q* em cache (por gamma); devolve uma cópia editável
+    return QTable(_q_star_values(gamma).copy())
+
+def q_star_distance(Q: Mapping[State, np.ndarray], gamma: float = 1.0, Q_star: Optional[QTable] = None) -> float:
+    #erro absoluto médio entre Q e Q* nos estados de decisão (somas 4..21), nas duas ações
+    Q = Q if isinstance(Q, QTable) else QTable.from_dict(Q)
+    star = Q_star.values if Q_star is not None else _q_star_values(gamma)
+    return float(np.abs(Q.values[DECISION_STATES] - star[DECISION_STATES]).mean())
+
+def main():
+    from analysis_utils import learned_policy_table, print_policy_ascii
+    from qlearning import evaluate_policy_exact, save_qtable
+
+    parser = argparse.ArgumentParser(description="Q* do blackjack por iteração de valor.")
+    parser.add_argument("--gamma", type=float, default=1.0)
+    parser.add_argument("--save", type=str, default="", help="salva Q* (save_qtable) nesse caminho")
+    args = parser.parse_args()
+
+    Q, info = value_iteration(args.gamma)
+    print(f"Iteração de valor: {info['iterations']} iterações (delta={info['delta']:.2e})")
+    print_policy_ascii(learned_policy_table(Q, usable_ace=False), "Política ótima — SEM Ás utilizável (S=parar, H=pedir)")
+    print_policy_ascii(learned_policy_table(Q, usable_ace=True), "Política ótima — COM Ás utilizável (S=parar, H=pedir)")
+    ev = evaluate_policy_exact(Q)
+    print(f"\nwin={ev['win_rate']:.4f} draw={ev['draw_rate']:.4f} loss={ev['loss_rate']:.4f} "
+          f"avg_return={ev['avg_return']:.4f}")
+    if args.save:
+        path = save_qtable(args.save, Q, {"solver": "value_iteration", "gamma": args.gamma, **info})
+        print(f"[OK] Q* salva em: {path}")
+
+if __name__ == "__main__":
+    main()
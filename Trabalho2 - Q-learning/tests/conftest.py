@@ -0,0 +1,6 @@
+#os módulos do projeto são importados pelo nome (python main.py roda da pasta do projeto),
+#então os testes põem a pasta do projeto no sys.path
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
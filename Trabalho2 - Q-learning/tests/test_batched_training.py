@@ -0,0 +1,46 @@
+#train_q_learning_batched: cada configuração do lote é igual ao treino vetorizado sozinho com a mesma seed
+import numpy as np
+
+from qlearning import train_q_learning, train_q_learning_batched
+
+def test_each_config_matches_vectorized_training():
+    configs = [(6_000, 0.05, 1.0, 0.999, 3), (9_000, 0.2, 0.9, 0.9995, 4), (6_000, 0.1, 1.0, 0.999, 3)]
+    n, alpha, gamma, decay, seed = (list(x) for x in zip(*configs))
+    outs = train_q_learning_batched(n, alpha, gamma, eps_decay=decay, seed=seed, n_envs=32)
+    for (Q, stats), (n_c, a_c, g_c, d_c, s_c) in zip(outs, configs):
+        Q_ref, ref = train_q_learning(num_episodes=n_c, alpha=a_c, gamma=g_c, eps_decay=d_c, seed=s_c, n_envs=32)
+        assert np.array_equal(Q.values, Q_ref.values)
+        assert np.array_equal(stats["episode_rewards"], ref["episode_rewards"])
+        assert stats["stopped_episode"] == n_c
+
+def test_config_does_not_depend_on_batch_members():
+    alone = train_q_learning_batched(5_000, 0.1, seed=7, n_envs=32)[0][0]
+    mixed = train_q_learning_batched([5_000, 8_000], [0.1, 0.3], seed=[7, 8], n_envs=32)[0][0]
+    assert np.array_equal(alone.values, mixed.values)
+
+def test_grouped_env_matches_separate_envs():
+    #grupos do VecBlackjackEnv (seed em lista) jogam igual a ambientes separados com a mesma seed
+    from env_blackjack import VecBlackjackEnv
+    for mode in ("simulate", "sample"):
+        grouped = VecBlackjackEnv(3 * 16, seed=[1, 2, 3], dealer_mode=mode)
+        alone = [VecBlackjackEnv(16, seed=s, dealer_mode=mode) for s in (1, 2, 3)]
+        obs = grouped.reset()
+        assert np.array_equal(obs, np.concatenate([env.reset() for env in alone]))
+        actions = np.random.default_rng(0).integers(0, 2, size=(2_000, 3 * 16))
+        for a in actions:
+            got = grouped.step(a)
+            want = [env.step(a[g * 16:(g + 1) * 16]) for g, env in enumerate(alone)]
+            for x, y in zip(got, zip(*want)):
+                assert np.array_equal(x, np.concatenate(y))
+
+def test_grouped_stream_refills_per_group():
+    #pedidos de tamanhos variados, com bloco pequeno pra forçar vários refills
+    from env_blackjack import GroupedStream, sample_cards
+    rng = np.random.default_rng(0)
+    grouped = GroupedStream([np.random.default_rng(s) for s in (1, 2, 3)], sample_cards, block=64)
+    alone = [GroupedStream([np.random.default_rng(s)], sample_cards, block=64) for s in (1, 2, 3)]
+    for _ in range(500):
+        counts = rng.integers(0, 40, size=3)
+        owner = np.repeat(np.arange(3), counts)
+        want = np.concatenate([alone[g].take(np.zeros(n, dtype=np.int64)).copy() for g, n in enumerate(counts)])
+        assert np.array_equal(grouped.take(owner), want)
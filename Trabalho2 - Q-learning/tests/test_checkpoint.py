@@ -0,0 +1,34 @@
+#checkpoint: treino interrompido e retomado do último checkpoint dá o mesmo resultado do treino direto
+import numpy as np
+import pytest
+
+import qlearning
+from qlearning import train_q_learning
+
+class _Interrupted(Exception):
+    pass
+
+def test_resume_from_checkpoint_is_bit_identical(tmp_path, monkeypatch):
+    kw = dict(num_episodes=20_000, alpha=0.1, gamma=0.95, seed=9)
+    Q_ref, ref = train_q_learning(**kw)
+
+    ckpt = str(tmp_path / "run.ckpt")
+    episode = qlearning.train_episode
+    calls = {"n": 0}
+
+    def crash_after_12345(*args):
+        calls["n"] += 1
+        if calls["n"] > 12_345:
+            raise _Interrupted
+        return episode(*args)
+
+    monkeypatch.setattr(qlearning, "train_episode", crash_after_12345)
+    with pytest.raises(_Interrupted):
+        train_q_learning(checkpoint_path=ckpt, checkpoint_every=10_000, **kw)
+    monkeypatch.setattr(qlearning, "train_episode", episode)
+
+    #retoma do checkpoint do episódio 10 000 e refaz 10 001..20 000
+    Q, stats = train_q_learning(checkpoint_path=ckpt, checkpoint_every=10_000, **kw)
+    assert np.array_equal(Q.values, Q_ref.values)
+    assert np.array_equal(stats["episode_rewards"], ref["episode_rewards"])
+    assert (stats["wins"], stats["losses"], stats["draws"]) == (ref["wins"], ref["losses"], ref["draws"])
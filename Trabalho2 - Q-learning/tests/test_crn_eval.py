@@ -0,0 +1,72 @@
+#avaliação CRN: _replay joga as mesmas regras do FastBlackjackEnv com as cartas do baralho
+import numpy as np
+import pytest
+
+from crn_eval import DECK_WIDTH, _replay, evaluate_policies_crn, make_deck
+from env_blackjack import N_STATES, FastBlackjackEnv, state_index
+from qlearning import QTable
+
+class _DeckCards:
+    #fonte de cartas do FastBlackjackEnv lendo uma linha do baralho na ordem das colunas:
+    #0-3 no reset, 4 + t % 14 nos pedidos do jogador, 18 + j % 14 nas compras do dealer
+    rng = None
+
+    def start(self, row):
+        self.row, self.n, self.hits, self.dealer, self.draws = row, 0, 0, False, 0
+
+    def draw(self) -> int:
+        if self.n < 4:
+            col = self.n
+            self.n += 1
+        elif self.dealer:
+            col = 18 + self.draws % 14
+            self.draws += 1
+        else:
+            col = 4 + self.hits % 14
+            self.hits += 1
+        return int(self.row[col])
+
+def _play(env, cards, policy, row) -> float:
+    cards.start(row)
+    s = env.reset()
+    while True:
+        a = int(policy[state_index(s)])
+        cards.dealer = a == 0
+        s, r, done = env.step(a)
+        if done:
+            return r
+
+def _policies():
+    rng = np.random.default_rng(3)
+    hit_below = np.zeros(N_STATES, dtype=np.int8)
+    for p_sum in range(4, 32):
+        for d_up in range(1, 11):
+            for ace in (0, 1):
+                hit_below[state_index((p_sum, d_up, ace))] = p_sum < 17
+    return np.stack([np.zeros(N_STATES, dtype=np.int8), np.ones(N_STATES, dtype=np.int8), hit_below,
+                     rng.integers(0, 2, size=N_STATES, dtype=np.int8)])
+
+@pytest.fixture(scope="module")
+def deck(tmp_path_factory):
+    return make_deck(str(tmp_path_factory.mktemp("decks") / "deck.npy"), 5_000, seed=11)
+
+def test_replay_matches_fast_env(deck):
+    assert deck.shape == (5_000, DECK_WIDTH)
+    policies = _policies()
+    rows = np.asarray(deck)
+    G = _replay(policies, rows)
+    cards = _DeckCards()
+    env = FastBlackjackEnv()
+    env.set_cards(cards)
+    for k, policy in enumerate(policies):
+        expected = np.array([_play(env, cards, policy, row) for row in rows])
+        assert np.array_equal(G[k], expected), k
+
+def test_baseline_diff_is_zero(deck):
+    rng = np.random.default_rng(4)
+    Qs = [QTable(rng.normal(size=(N_STATES, 2)).astype(np.float32)) for _ in range(3)]
+    for j in range(3):
+        evs = evaluate_policies_crn(Qs, deck, baseline=j, chunk=1_024)
+        assert evs[j]["diff"] == evs[j]["diff_ci_low"] == evs[j]["diff_ci_high"] == 0.0
+        for ev in evs:
+            assert ev["diff"] == pytest.approx(ev["avg_return"] - evs[j]["avg_return"], abs=1e-12)
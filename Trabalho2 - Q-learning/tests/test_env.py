@@ -0,0 +1,20 @@
+#FastBlackjackEnv: mesma seed -> exatamente os mesmos episódios do BlackjackEnv, em todo dealer_mode
+import random
+
+import pytest
+
+from env_blackjack import DEALER_MODES, BlackjackEnv, FastBlackjackEnv
+
+@pytest.mark.parametrize("dealer_mode", DEALER_MODES)
+def test_fast_env_matches_reference_env(dealer_mode):
+    ref = BlackjackEnv(dealer_mode=dealer_mode, seed=3)
+    fast = FastBlackjackEnv(dealer_mode=dealer_mode, seed=3)
+    policy = random.Random(0)
+    for _ in range(20_000):
+        s = ref.reset()
+        assert fast.reset() == s
+        done = False
+        while not done:
+            a = policy.randrange(2)
+            s, r, done = ref.step(a)
+            assert fast.step(a) == (s, r, done)
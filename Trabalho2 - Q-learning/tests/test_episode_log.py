@@ -0,0 +1,31 @@
+#train_offline: com uma pista é o Q-learning sequencial exato sobre o log
+import numpy as np
+
+from env_blackjack import N_STATES
+from episode_log import load_episode_log, record_episodes, save_episode_log, train_offline
+
+def _replay_loop(log, alpha, gamma, epochs=1):
+    #Q-learning transição a transição, na ordem do log
+    q = np.zeros((N_STATES, 2), dtype=np.float32)
+    alpha, gamma = np.float32(alpha), np.float32(gamma)
+    for _ in range(epochs):
+        for t in range(len(log)):
+            s, a, r = int(log["state"][t]), int(log["action"][t]), log["reward"][t]
+            target = r if log["done"][t] else r + gamma * q[int(log["state"][t + 1])].max()
+            q[s, a] += alpha * (target - q[s, a])
+    return q
+
+def test_single_lane_matches_sequential_loop():
+    log = record_episodes(2_000, seed=5, n_envs=64)
+    configs = [(0.05, 1.0), (0.2, 0.9)]
+    Qs = train_offline(log, [a for a, _ in configs], [g for _, g in configs], n_lanes=1, epochs=2)
+    for (alpha, gamma), Q in zip(configs, Qs):
+        assert np.array_equal(Q.values, _replay_loop(log, alpha, gamma, epochs=2))
+
+def test_log_round_trip(tmp_path):
+    log = record_episodes(500, seed=1, n_envs=16)
+    assert int(log["done"].sum()) == 500 and log["done"][-1]
+    save_episode_log(str(tmp_path / "run"), log, {"seed": 1})
+    loaded, info = load_episode_log(str(tmp_path / "run.npy"))
+    assert np.array_equal(loaded, log)
+    assert info["episodes"] == 500 and info["meta"] == {"seed": 1}
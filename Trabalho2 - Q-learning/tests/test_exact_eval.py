@@ -0,0 +1,25 @@
+#evaluate_policy_exact: bate com uma avaliação Monte Carlo grande, dentro do IC dela
+import numpy as np
+import pytest
+
+from env_blackjack import N_STATES
+from qlearning import QTable, evaluate_policies_batched, evaluate_policy_exact
+from solver import optimal_q
+
+def _fixed_q():
+    return QTable(np.random.default_rng(21).normal(size=(N_STATES, 2)).astype(np.float32))
+
+def test_stand_always_exact_value():
+    #Q zerada = sempre parar
+    ev = evaluate_policy_exact(QTable())
+    assert ev["avg_return"] == pytest.approx(-0.18637, abs=5e-6)
+    assert ev["win_rate"] + ev["draw_rate"] + ev["loss_rate"] == pytest.approx(1.0)
+
+def test_exact_matches_monte_carlo():
+    Qs = [QTable(), optimal_q(), _fixed_q()]
+    mc = evaluate_policies_batched(Qs, n_episodes=400_000, seed=5, n_envs=4096, confidence=0.999)
+    for Q, ev in zip(Qs, mc):
+        exact = evaluate_policy_exact(Q)
+        assert ev["ci_low"] <= exact["avg_return"] <= ev["ci_high"]
+        for rate in ("win_rate", "draw_rate", "loss_rate"):
+            assert exact[rate] == pytest.approx(ev[rate], abs=0.005)
@@ -0,0 +1,35 @@
+#experiments.py: --workers dá as mesmas linhas do laço serial; --resume só roda o que falta
+import csv
+import os
+import subprocess
+import sys
+
+EXPERIMENTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "experiments.py")
+TIMING = {"train_time_s", "eval_time_s"}
+
+def _run_grid(tmp_path, name, *extra):
+    out = tmp_path / name
+    subprocess.run([sys.executable, EXPERIMENTS, "--alphas", "0.05,0.2", "--gammas", "1.0,0.9",
+                    "--episodes", "3000", "--repeats", "2", "--eval-episodes", "2000",
+                    "--out", str(out), *extra], cwd=tmp_path, check=True, capture_output=True)
+    with open(out, newline="", encoding="utf-8") as f:
+        return [{k: v for k, v in row.items() if k not in TIMING} for row in csv.DictReader(f)]
+
+def test_pool_matches_serial_grid(tmp_path):
+    serial = _run_grid(tmp_path, "serial.csv")
+    pooled = _run_grid(tmp_path, "pool.csv", "--workers", "3")
+    assert len(serial) == 8
+    assert pooled == serial
+
+def test_resume_skips_rows_already_in_csv(tmp_path):
+    out = tmp_path / "res.csv"
+    base = [sys.executable, EXPERIMENTS, "--episodes", "2000", "--eval-episodes", "1000", "--out", str(out)]
+    subprocess.run(base + ["--alphas", "0.05,0.1"], cwd=tmp_path, check=True, capture_output=True)
+    with open(out, newline="", encoding="utf-8") as f:
+        first = list(csv.DictReader(f))
+    subprocess.run(base + ["--alphas", "0.05,0.1,0.2", "--resume"], cwd=tmp_path, check=True, capture_output=True)
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    #as duas linhas antigas ficam intactas (inclusive os tempos) e só alpha=0.2 é acrescentado
+    assert rows[:2] == first
+    assert [r["alpha"] for r in rows] == ["0.05", "0.1", "0.2"]
@@ -0,0 +1,19 @@
+#train_episode é o único episódio TD escalar: treino serial, instrumentado e ator Hogwild dão o mesmo resultado
+import numpy as np
+
+from parallel_training import train_q_learning_parallel
+from qlearning import train_q_learning
+
+def test_profiled_training_matches_plain():
+    Q, stats = train_q_learning(20_000, alpha=0.05, seed=42)
+    Q_prof, prof = train_q_learning(20_000, alpha=0.05, seed=42, profile=True)
+    assert np.array_equal(Q.values, Q_prof.values)
+    assert (stats["wins"], stats["losses"], stats["draws"]) == (prof["wins"], prof["losses"], prof["draws"])
+
+def test_single_actor_matches_serial_training():
+    #com 1 ator não há concorrência: é o treino serial com a seed filha do ator
+    seed = int(np.random.SeedSequence(5).spawn(1)[0].generate_state(1)[0])
+    Q_par, par = train_q_learning_parallel(10_000, alpha=0.1, seed=5, n_actors=1)
+    Q, stats = train_q_learning(10_000, alpha=0.1, seed=seed)
+    assert np.array_equal(Q_par.values, Q.values)
+    assert np.array_equal(par["episode_rewards"], stats["episode_rewards"])
@@ -0,0 +1,73 @@
+#ida e volta com o servidor de políticas: pedido válido, linha malformada e política desconhecida
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from policy_server import PolicyClient, PolicyServer
+from qlearning import greedy_policy, train_q_learning
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=10))
+
+@pytest.fixture(scope="module")
+def trained():
+    Q, _ = train_q_learning(num_episodes=5_000, seed=1)
+    return Q
+
+async def _with_server(Q, body):
+    server = PolicyServer(["run"], np.stack([greedy_policy(Q)]))
+    sock = await server.start(port=0)
+    port = sock.sockets[0].getsockname()[1]
+    try:
+        return await body(port)
+    finally:
+        sock.close()
+        await sock.wait_closed()
+        await server.batcher.stop()
+
+def test_act_matches_greedy_policy(trained):
+    states = [(15, 10, 0), (12, 2, 0), (18, 9, 1), (20, 5, 1)]
+
+    async def body(port):
+        client = await PolicyClient.connect(port=port)
+        try:
+            single = await client.act(states[0])
+            batch = await client.act_batch(states)
+        finally:
+            await client.close()
+        return single, batch
+
+    single, batch = _run(_with_server(trained, body))
+    expected = [int(np.argmax(trained[s])) for s in states]
+    assert single == expected[0]
+    assert batch == expected
+
+@pytest.mark.parametrize("line", [b"[1,2,3]\n", b"nao e json\n", b'{"id": 7, "op": "act"}\n'])
+def test_malformed_line_gets_error_reply(trained, line):
+    async def body(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(line)
+        await writer.drain()
+        reply = json.loads(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        return reply
+
+    reply = _run(_with_server(trained, body))
+    assert "error" in reply
+    assert reply["error"] != "'state'"
+
+def test_unknown_policy_raises_on_client(trained):
+    async def body(port):
+        client = await PolicyClient.connect(port=port)
+        try:
+            with pytest.raises(ValueError, match="desconhecida"):
+                await client.act((15, 10, 0), policy="nao_existe")
+            #a conexão continua útil depois do erro
+            return await client.policies()
+        finally:
+            await client.close()
+
+    assert _run(_with_server(trained, body)) == ["run"]
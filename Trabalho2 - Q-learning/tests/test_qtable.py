@@ -0,0 +1,38 @@
+#QTable densa: o treino dá bit a bit o mesmo resultado do laço original com defaultdict
+import random
+from collections import defaultdict
+
+import numpy as np
+
+from env_blackjack import BlackjackEnv
+from qlearning import epsilon_greedy, train_q_learning
+
+def _train_dict(num_episodes, alpha, gamma, eps_decay, seed, eps_start=1.0, eps_end=0.05):
+    #o train_q_learning de antes da QTable (Q num defaultdict, ambiente de referência)
+    env = BlackjackEnv(seed=seed)
+    rng = random.Random(seed)
+    Q = defaultdict(lambda: np.zeros(2, dtype=np.float32))
+    epsilon = eps_start
+    rewards = []
+    for _ in range(num_episodes):
+        s = env.reset()
+        done = False
+        G = 0.0
+        while not done:
+            a = epsilon_greedy(Q, s, epsilon, rng)
+            s2, r, done = env.step(a)
+            target = r + (0.0 if done else gamma * np.max(Q[s2]))
+            Q[s][a] += alpha * (target - Q[s][a])
+            s = s2
+            G += r
+        rewards.append(G)
+        epsilon = max(eps_end, epsilon * eps_decay)
+    return Q, np.array(rewards, dtype=np.float32)
+
+def test_dense_training_matches_dict_training():
+    Q_ref, rewards = _train_dict(5_000, alpha=0.1, gamma=0.9, eps_decay=0.999, seed=11)
+    Q, stats = train_q_learning(5_000, alpha=0.1, gamma=0.9, eps_decay=0.999, seed=11)
+    assert np.array_equal(stats["episode_rewards"], rewards)
+    for s, row in Q_ref.items():
+        assert np.array_equal(Q[s], row), s
+    assert np.count_nonzero(Q.values) == sum(np.count_nonzero(row) for row in Q_ref.values())
@@ -0,0 +1,33 @@
+#render_curves: o manifesto só registra PNGs que foram desenhados de verdade
+import json
+import sys
+
+import numpy as np
+import pytest
+
+import analysis_utils
+import render_curves
+from analysis_utils import save_curve_data
+
+pytest.importorskip("matplotlib")
+
+def _render(monkeypatch, curves_dir):
+    monkeypatch.setattr(sys, "argv", ["render_curves.py", str(curves_dir)])
+    render_curves.main()
+    with open(curves_dir / render_curves.MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+def test_skipped_plot_keeps_old_manifest_entry(tmp_path, monkeypatch):
+    npz = tmp_path / "curve.npz"
+    save_curve_data(np.random.default_rng(0).choice([-1.0, 0.0, 1.0], size=5_000), str(npz))
+    old = _render(monkeypatch, tmp_path)["curve.png"]
+    assert (tmp_path / "curve.png").exists()
+
+    #dados novos, mas sem matplotlib: o PNG antigo continua lá e não pode virar "atualizado"
+    save_curve_data(np.random.default_rng(1).choice([-1.0, 0.0, 1.0], size=5_000), str(npz))
+    monkeypatch.setattr(analysis_utils, "HAS_MPL", False)
+    assert _render(monkeypatch, tmp_path)["curve.png"] == old
+
+    #com o matplotlib de volta, o gráfico é refeito e o hash novo é registrado
+    monkeypatch.setattr(analysis_utils, "HAS_MPL", True)
+    assert _render(monkeypatch, tmp_path)["curve.png"] == render_curves._file_hash(str(npz))
@@ -0,0 +1,38 @@
+#summarize: métricas do run contadas uma vez por run, e desvio estável com média grande
+import math
+import statistics
+
+import pytest
+
+from results_db import add_result, connect, summarize
+
+def _row(seed, avg_return, q_dist, train_time):
+    return {"alpha": 0.1, "gamma": 1.0, "episodes": 1000, "eps_start": 1.0, "eps_end": 0.05,
+            "eps_decay": 0.9995, "seed": seed, "avg_return": avg_return, "eval_episodes": 100,
+            "q_star_dist": q_dist, "train_time_s": train_time}
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "r.db"))
+    yield conn
+    conn.close()
+
+def test_run_metrics_not_duplicated_by_extra_evaluations(conn):
+    run_ids = [add_result(conn, _row(seed, -0.05 + 0.01 * seed, 0.1 * seed, 1.0)) for seed in (1, 2, 3)]
+    #segunda avaliação (outro modo) do primeiro run
+    conn.execute("INSERT INTO evaluations (run_id, mode, avg_return) VALUES (?, 'exact', -0.04)", [run_ids[0]])
+
+    q = summarize(conn, metric="q_star_dist")[0]
+    assert q["n"] == 3
+    assert q["mean"] == pytest.approx(0.2)
+    assert summarize(conn, metric="avg_return")[0]["n"] == 4
+    assert summarize(conn, metric="avg_return", mode="mc")[0]["n"] == 3
+    assert summarize(conn, metric="q_star_dist", mode="exact")[0]["n"] == 1
+
+def test_std_is_stable_for_small_spread(conn):
+    values = [1e8 + d for d in (0.001, 0.002, 0.003, 0.004)]
+    for seed, v in enumerate(values):
+        add_result(conn, _row(seed, -0.05, 0.1, v))
+    row = summarize(conn, metric="train_time_s")[0]
+    assert row["std"] == pytest.approx(statistics.stdev(values), rel=1e-6)
+    assert not math.isnan(row["ci_low"])
@@ -0,0 +1,41 @@
+#value_iteration: V* no início do jogo bate com a avaliação exata da política ótima
+import numpy as np
+import pytest
+
+from env_blackjack import CARD_PROBS
+from qlearning import evaluate_policy_exact
+from solver import optimal_q, q_star_distance, value_iteration
+
+def _start_value(Q) -> float:
+    #V*(início) = média de max_a Q*(s0) sobre as duas cartas do jogador e a carta aberta do dealer
+    total = 0.0
+    for p1, q1 in CARD_PROBS.items():
+        for p2, q2 in CARD_PROBS.items():
+            raw, ace = p1 + p2, p1 == 1 or p2 == 1
+            usable = ace and raw + 10 <= 21
+            for d, qd in CARD_PROBS.items():
+                s = (raw + 10 * usable, d, int(usable))
+                total += q1 * q2 * qd * float(Q[s].max())
+    return total
+
+def test_start_value_matches_exact_evaluation():
+    Q_star = optimal_q()
+    v_star = _start_value(Q_star)
+    assert v_star == pytest.approx(evaluate_policy_exact(Q_star)["avg_return"], abs=1e-9)
+    assert v_star == pytest.approx(-0.04656, abs=5e-6)
+    assert value_iteration()[1]["delta"] <= 1e-12
+
+def test_q_star_distance():
+    Q_star = optimal_q()
+    assert q_star_distance(Q_star) == 0.0
+    Q_star.values[:] += 0.5
+    assert q_star_distance(Q_star) == pytest.approx(0.5)
+
+@pytest.mark.parametrize("state, action", [
+    ((12, 2, 0), 1), ((12, 4, 0), 0), ((16, 6, 0), 0), ((16, 10, 0), 1), ((17, 1, 0), 0),
+    ((18, 8, 1), 0), ((18, 9, 1), 1), ((17, 7, 1), 1), ((19, 10, 1), 0), ((11, 10, 0), 1),
+])
+def test_textbook_strategy(state, action):
+    #estratégia básica de baralho infinito sem dobrar/dividir
+    q = optimal_q()[state]
+    assert int(np.argmax(q)) == action
@@ -2,8 +2,7 @@
 # estamos utiizando o dataset Iris (de flores) do scikit
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from decision_tree import DecisionTree
 
 # dividindo dados para treino e para teste
@@ -24,6 +23,7 @@ def main():
     
     # carregar dataset
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y = iris.target
@@ -86,6 +86,7 @@ def main():
     
     # plotar gráfico de profundidade
     print(f"\n8. Gerando gráficos...")
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(profundidades, acuracias_train, marker='o', linewidth=2, 
              markersize=8, label='Treino')
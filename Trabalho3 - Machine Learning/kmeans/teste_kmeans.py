@@ -2,8 +2,7 @@
 # estamos utiizando o dataset Iris (de flores) do scikit para visualação de cluster
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from kmeans import KMeans
 
 
@@ -14,6 +13,7 @@ def main():
     
     # carregando o dataset Iris
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y_real = iris.target  # Para comparação (não usado no treino!)
@@ -28,6 +28,7 @@ def main():
     inercias = kmeans_teste.metodo_cotovelo(X, k_max=10)
     
     # plotar método do cotovelo
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(range(1, 11), inercias, marker='o', linewidth=2, markersize=10)
     plt.xlabel('Número de Clusters (k)', fontsize=12)
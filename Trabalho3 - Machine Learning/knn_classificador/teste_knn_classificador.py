@@ -2,8 +2,7 @@
 # estamos utiizando o dataset Iris (de flores) do scikit
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from knn_classificador import KNNClassificador
 
 # treino e teste
@@ -24,6 +23,7 @@ def main():
     
     # carregar dataset Iris
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y = iris.target
@@ -76,6 +76,7 @@ def main():
     
     # plotar gráfico
     print(f"\n8. Gerando gráfico...")
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(k_valores, acuracias, marker='o', linewidth=2, markersize=8)
     plt.xlabel('Valor de K', fontsize=12)
@@ -2,8 +2,7 @@
 # estamos utiizando o dataset California Housing (preços de casas) do scikit
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from knn_regressor import KNNRegressor
 
 # deividindo treino e teste
@@ -24,6 +23,7 @@ def main():
     
     # carregar dataset
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     california = datasets.fetch_california_housing()
     
     # usar apenas uma amostra para velocidade
@@ -92,6 +92,7 @@ def main():
     print(f"\n8. Gerando gráficos...")
     
     # gráfico 1: Valores reais vs preditos
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.scatter(y_test, y_pred, alpha=0.6, s=50, edgecolors='black')
     plt.plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()],
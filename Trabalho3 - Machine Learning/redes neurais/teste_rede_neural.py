@@ -2,8 +2,7 @@
 # estamos utiizando diferentes datasets do scikit
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from rede_neural import RedeNeural
 
 # dividindo treino e teste
@@ -34,6 +33,7 @@ def teste_iris():
     
     # carregar dados
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y = iris.target
@@ -75,6 +75,7 @@ def teste_iris():
               f"Confiança: {probs[i, y_pred[i]]:.2%}")
     
     # plotar convergência
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(range(0, rede.n_iteracoes, 100), rede.historico_custo, 
              linewidth=2, marker='o')
@@ -96,6 +97,7 @@ def teste_digits():
     
     # carregar dados
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     digits = datasets.load_digits()
     X = digits.data  # 64 features (8x8 pixels)
     y = digits.target  # 10 classes (0-9)
@@ -131,6 +133,7 @@ def teste_digits():
     y_pred = rede.predict(X_test_norm)
     probs = rede.predict_proba(X_test_norm)
     
+    import matplotlib.pyplot as plt
     fig, axes = plt.subplots(2, 5, figsize=(12, 6))
     axes = axes.ravel()
     
@@ -167,6 +170,7 @@ def comparar_arquiteturas():
     print("=" * 60)
     
     # usar Iris para comparação
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y = iris.target
@@ -204,6 +208,7 @@ def comparar_arquiteturas():
         })
     
     # plotar comparação
+    import matplotlib.pyplot as plt
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
     
     # acurácias
@@ -244,6 +249,7 @@ def comparar_ativacoes():
     print("=" * 60)
     
     # usar Iris
+    from sklearn import datasets
     iris = datasets.load_iris()
     X = iris.data
     y = iris.target
@@ -266,6 +272,7 @@ def comparar_ativacoes():
     print(f"   - Acurácia: {acc_relu:.2%}")
     
     # plotar comparação
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(range(0, 2000, 100), rede_sigmoid.historico_custo, 
             linewidth=2, marker='o', label=f'Sigmoid (Acc: {acc_sigmoid:.2%})')
@@ -2,8 +2,7 @@
 # estamos utiizando o dataset Breast Cancer (cancer de mama) do scikit
 
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn import datasets
+# matplotlib e sklearn são pesados: importados dentro das funções, só quando usados
 from regressao_logistica import RegressaoLogistica
 
 # divir entre treino e teste
@@ -37,6 +36,7 @@ def main():
     
     # carregar dataset
     print("\n1. Carregando dados...")
+    from sklearn import datasets
     cancer = datasets.load_breast_cancer()
     X = cancer.data
     y = cancer.target
@@ -112,6 +112,7 @@ def main():
     
     # plotar curva de custo
     print(f"\n10. Gerando gráficos...")
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(10, 6))
     plt.plot(range(0, modelo.n_iteracoes, 100), modelo.historico_custo, 
              linewidth=2, marker='o')